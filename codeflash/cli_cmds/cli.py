@@ -115,6 +115,8 @@ def process_pyproject_config(args: Namespace) -> Namespace:
         "formatter_cmds",
         "disable_telemetry",
         "disable_imports_sorting",
+        "parallel_behavioral_tests",
+        "pytest_fork_server",
         "git_remote",
     ]
     for key in supported_keys:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import ast
+from functools import lru_cache
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -34,8 +35,17 @@ class FutureAliasedImportTransformer(cst.CSTTransformer):
         return updated_node
 
 
+@lru_cache(maxsize=16)
+def parse_module_cached(module_code: str) -> cst.Module:
+    """Parse module code with libcst, the same candidate code is parsed again for every module it is applied to.
+
+    libcst trees are immutable, visiting them with a transformer returns a new tree, so the cached tree can be shared.
+    """
+    return cst.parse_module(module_code)
+
+
 def delete___future___aliased_imports(module_code: str) -> str:
-    return cst.parse_module(module_code).visit(FutureAliasedImportTransformer()).code
+    return parse_module_cached(module_code).visit(FutureAliasedImportTransformer()).code
 
 
 def add_needed_imports_from_module(
@@ -67,7 +77,7 @@ def add_needed_imports_from_module(
             full_package_name=src_module_and_package.package,
         )
     )
-    cst.parse_module(src_module_code).visit(gatherer)
+    parse_module_cached(src_module_code).visit(gatherer)
     try:
         for mod in gatherer.module_imports:
             AddImportsVisitor.add_needed_import(dst_context, mod)
@@ -92,7 +102,7 @@ def add_needed_imports_from_module(
             RemoveImportsVisitor.remove_unused_import(dst_context, mod, alias_pair[0], asname=alias_pair[1])
 
     try:
-        parsed_module = cst.parse_module(dst_module_code)
+        parsed_module = parse_module_cached(dst_module_code)
     except cst.ParserSyntaxError as e:
         logger.exception(f"Syntax error in destination module code: {e}")
         return dst_module_code  # Return the original code if there's a syntax error
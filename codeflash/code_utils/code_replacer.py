@@ -8,7 +8,7 @@ from typing import TYPE_CHECKING, Optional, TypeVar
 import libcst as cst
 
 from codeflash.cli_cmds.console import logger
-from codeflash.code_utils.code_extractor import add_needed_imports_from_module
+from codeflash.code_utils.code_extractor import add_needed_imports_from_module, parse_module_cached
 from codeflash.models.models import FunctionParent
 
 if TYPE_CHECKING:
@@ -34,8 +34,6 @@ def normalize_code(code: str) -> str:
 
 
 class OptimFunctionCollector(cst.CSTVisitor):
-    METADATA_DEPENDENCIES = (cst.metadata.ParentNodeProvider,)
-
     def __init__(
         self,
         preexisting_objects: set[tuple[str, tuple[FunctionParent, ...]]] | None = None,
@@ -173,10 +171,10 @@ def replace_functions_in_file(
             return source_code
         parsed_function_names.append((class_name, function_name))
 
-    # Collect functions we want to modify from the optimized code
-    module = cst.metadata.MetadataWrapper(cst.parse_module(optimized_code))
+    # Collect functions we want to modify from the optimized code, the collector needs no metadata so the cached tree
+    # is visited directly instead of through a MetadataWrapper, which would deep copy it first
     visitor = OptimFunctionCollector(preexisting_objects, set(parsed_function_names))
-    module.visit(visitor)
+    parse_module_cached(optimized_code).visit(visitor)
 
     # Replace these functions in the original code
     transformer = OptimFunctionReplacer(
@@ -185,11 +183,60 @@ def replace_functions_in_file(
         new_class_functions=visitor.new_class_functions,
         modified_init_functions=visitor.modified_init_functions,
     )
-    original_module = cst.parse_module(source_code)
+    original_module = parse_module_cached(source_code)
     modified_tree = original_module.visit(transformer)
     return modified_tree.code
 
 
+def collect_function_dumps(tree: ast.Module) -> dict[tuple[str | None, str], set[str]] | None:
+    """Dump the functions the replacer can see, keyed like its (class_name, function_name), None for nested classes.
+
+    Like OptimFunctionCollector and OptimFunctionReplacer, function bodies are not recursed into. Both treat nested
+    classes slightly differently, so modules with nested classes are left to them.
+    """
+    function_dumps: dict[tuple[str | None, str], set[str]] = defaultdict(set)
+    stack: list[tuple[ast.AST, str | None]] = [(tree, None)]
+    while stack:
+        node, class_name = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                function_dumps[(class_name, child.name)].add(ast.dump(child))
+            elif isinstance(child, ast.ClassDef):
+                if class_name is not None:
+                    return None
+                stack.append((child, child.name))
+            else:
+                stack.append((child, class_name))
+    return function_dumps
+
+
+def can_change_module(
+    source_code: str, optimized_code: str, preexisting_objects: set[tuple[str, tuple[FunctionParent, ...]]]
+) -> bool:
+    """Cheaply tell whether replacing the functions from optimized_code can change source_code at all.
+
+    Nothing can change when every function in the optimized code that is also in the module is identical to it, and
+    none of them would be added to the module as a new function. The ast comparison is exact, so anything else,
+    including syntax errors, goes through the libcst replacement.
+    """
+    try:
+        original_functions = collect_function_dumps(ast.parse(source_code))
+        optimized_functions = collect_function_dumps(ast.parse(optimized_code))
+    except SyntaxError:
+        return True
+    if original_functions is None or optimized_functions is None:
+        return True
+    for (class_name, function_name), dumps in optimized_functions.items():
+        if preexisting_objects:
+            parents = () if class_name is None else (FunctionParent(name=class_name, type="ClassDef"),)
+            if (function_name, parents) not in preexisting_objects:
+                return True
+        original_dumps = original_functions.get((class_name, function_name))
+        if original_dumps is not None and original_dumps != dumps:
+            return True
+    return False
+
+
 def replace_functions_and_add_imports(
     source_code: str,
     function_names: list[str],
@@ -198,9 +245,29 @@ def replace_functions_and_add_imports(
     preexisting_objects: set[tuple[str, tuple[FunctionParent, ...]]],
     project_root_path: Path,
 ) -> str:
+    return replace_functions_and_add_imports_cached(
+        source_code,
+        tuple(function_names),
+        optimized_code,
+        module_abspath,
+        frozenset(preexisting_objects),
+        project_root_path,
+    )
+
+
+@lru_cache(maxsize=64)
+def replace_functions_and_add_imports_cached(
+    source_code: str,
+    function_names: tuple[str, ...],
+    optimized_code: str,
+    module_abspath: Path,
+    preexisting_objects: frozenset[tuple[str, tuple[FunctionParent, ...]]],
+    project_root_path: Path,
+) -> str:
+    """Only depends on its arguments, the winning candidate is replaced into the restored original code again."""
     return add_needed_imports_from_module(
         optimized_code,
-        replace_functions_in_file(source_code, function_names, optimized_code, preexisting_objects),
+        replace_functions_in_file(source_code, list(function_names), optimized_code, set(preexisting_objects)),
         module_abspath,
         module_abspath,
         project_root_path,
@@ -215,6 +282,8 @@ def replace_function_definitions_in_module(
     project_root_path: Path,
 ) -> bool:
     source_code: str = module_abspath.read_text(encoding="utf8")
+    if not can_change_module(source_code, optimized_code, preexisting_objects):
+        return False
     new_code: str = replace_functions_and_add_imports(
         source_code, function_names, optimized_code, module_abspath, preexisting_objects, project_root_path
     )
@@ -78,7 +78,9 @@ def get_all_function_names(code: str) -> tuple[bool, list[str]]:
     return True, function_names
 
 
+@lru_cache(maxsize=128)
 def get_run_tmp_file(file_path: Path) -> Path:
+    # the run's temporary directory is created once and keeps its name, so the joined paths can be cached
     if not hasattr(get_run_tmp_file, "tmpdir"):
         get_run_tmp_file.tmpdir = TemporaryDirectory(prefix="codeflash_")
     return Path(get_run_tmp_file.tmpdir.name) / file_path
@@ -55,7 +55,12 @@ def parse_config_file(
     path_keys = {"module-root", "tests-root"}
     path_list_keys = {"ignore-paths", }
     str_keys = {"pytest-cmd": "pytest", "git-remote": "origin"}
-    bool_keys = {"disable-telemetry": False, "disable-imports-sorting": False}
+    bool_keys = {
+        "disable-telemetry": False,
+        "disable-imports-sorting": False,
+        "parallel-behavioral-tests": False,
+        "pytest-fork-server": False,
+    }
     list_str_keys = {"formatter-cmds": ["black $file"]}
 
     for key in str_keys:
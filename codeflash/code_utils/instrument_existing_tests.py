@@ -16,6 +16,10 @@ if TYPE_CHECKING:
 
     from codeflash.models.models import CodePosition
 
+TEST_RESULTS_INSERT_SQL = "INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+# rows are buffered by codeflash_wrap and written in one transaction per batch, commits are the expensive part
+TEST_RESULTS_BATCH_SIZE = 50
+
 
 def node_in_call_position(node: ast.AST, call_positions: list[CodePosition]) -> bool:
     if isinstance(node, ast.Call) and hasattr(node, "lineno") and hasattr(node, "col_offset"):
@@ -240,6 +244,20 @@ class InjectPerfOnly(ast.NodeTransformer):
                                 lineno=node.lineno + 4,
                                 col_offset=node.col_offset,
                             ),
+                            # the results database is thrown away after the run, it does not need to survive an OS crash
+                            ast.Expr(
+                                value=ast.Call(
+                                    func=ast.Attribute(
+                                        value=ast.Name(id="codeflash_cur", ctx=ast.Load()),
+                                        attr="execute",
+                                        ctx=ast.Load(),
+                                    ),
+                                    args=[ast.Constant(value="PRAGMA synchronous = OFF")],
+                                    keywords=[],
+                                ),
+                                lineno=node.lineno + 5,
+                                col_offset=node.col_offset,
+                            ),
                             ast.Expr(
                                 value=ast.Call(
                                     func=ast.Attribute(
@@ -256,28 +274,38 @@ class InjectPerfOnly(ast.NodeTransformer):
                                     ],
                                     keywords=[],
                                 ),
-                                lineno=node.lineno + 5,
+                                lineno=node.lineno + 6,
                                 col_offset=node.col_offset,
                             ),
                         ]
                         if self.mode == TestingMode.BEHAVIOR
                         else []
                     ),
-                    *node.body,
                     *(
                         [
-                            ast.Expr(
-                                value=ast.Call(
-                                    func=ast.Attribute(
-                                        value=ast.Name(id="codeflash_con", ctx=ast.Load()), attr="close", ctx=ast.Load()
+                            # the buffered rows are also written when the test fails
+                            ast.Try(
+                                body=node.body,
+                                handlers=[],
+                                orelse=[],
+                                finalbody=[
+                                    *create_flush_rows_statements(),
+                                    ast.Expr(
+                                        value=ast.Call(
+                                            func=ast.Attribute(
+                                                value=ast.Name(id="codeflash_con", ctx=ast.Load()),
+                                                attr="close",
+                                                ctx=ast.Load(),
+                                            ),
+                                            args=[],
+                                            keywords=[],
+                                        )
                                     ),
-                                    args=[],
-                                    keywords=[],
-                                )
+                                ],
                             )
                         ]
                         if self.mode == TestingMode.BEHAVIOR
-                        else []
+                        else node.body
                     ),
                 ]
         return node
@@ -350,14 +378,82 @@ def inject_profiling_into_existing_test(
     ]
     if mode == TestingMode.BEHAVIOR:
         new_imports.extend(
-            [ast.Import(names=[ast.alias(name="sqlite3")]), ast.Import(names=[ast.alias(name="dill", asname="pickle")])]
+            [
+                ast.Import(names=[ast.alias(name="sqlite3")]),
+                ast.Import(names=[ast.alias(name="pickle")]),
+                ast.Import(names=[ast.alias(name="dill")]),
+            ]
         )
     if test_framework == "unittest":
         new_imports.append(ast.Import(names=[ast.alias(name="timeout_decorator")]))
-    tree.body = [*new_imports, create_wrapper_function(mode), *tree.body]
+    # number of calls so far per test_id, used for the invocation ids
+    codeflash_globals = [
+        ast.Assign(
+            targets=[ast.Name(id="codeflash_index", ctx=ast.Store())], value=ast.Dict(keys=[], values=[]), lineno=1
+        )
+    ]
+    if mode == TestingMode.BEHAVIOR:
+        codeflash_globals.append(
+            ast.Assign(
+                targets=[ast.Name(id="codeflash_rows", ctx=ast.Store())],
+                value=ast.List(elts=[], ctx=ast.Load()),
+                lineno=1,
+            )
+        )
+    tree.body = [*new_imports, *codeflash_globals, create_wrapper_function(mode), *tree.body]
     return True, isort.code(ast.unparse(tree), float_to_top=True)
 
 
+def create_pickled_return_value_assign(pickle_module: str) -> ast.Assign:
+    """Serialize the exception or the return value of the wrapped call with the given pickle module."""
+    return ast.Assign(
+        targets=[ast.Name(id="pickled_return_value", ctx=ast.Store())],
+        value=ast.IfExp(
+            test=ast.Name(id="exception", ctx=ast.Load()),
+            body=ast.Call(
+                func=ast.Attribute(value=ast.Name(id=pickle_module, ctx=ast.Load()), attr="dumps", ctx=ast.Load()),
+                args=[ast.Name(id="exception", ctx=ast.Load())],
+                keywords=[],
+            ),
+            orelse=ast.Call(
+                func=ast.Attribute(value=ast.Name(id=pickle_module, ctx=ast.Load()), attr="dumps", ctx=ast.Load()),
+                args=[ast.Name(id="return_value", ctx=ast.Load())],
+                keywords=[],
+            ),
+        ),
+        lineno=1,
+    )
+
+
+def create_flush_rows_statements() -> list[ast.stmt]:
+    """Write the rows buffered in codeflash_rows to the results table and commit them."""
+    return [
+        ast.Expr(
+            value=ast.Call(
+                func=ast.Attribute(
+                    value=ast.Name(id="codeflash_cur", ctx=ast.Load()), attr="executemany", ctx=ast.Load()
+                ),
+                args=[ast.Constant(value=TEST_RESULTS_INSERT_SQL), ast.Name(id="codeflash_rows", ctx=ast.Load())],
+                keywords=[],
+            )
+        ),
+        ast.Expr(
+            value=ast.Call(
+                func=ast.Attribute(value=ast.Name(id="codeflash_rows", ctx=ast.Load()), attr="clear", ctx=ast.Load()),
+                args=[],
+                keywords=[],
+            )
+        ),
+        ast.Expr(
+            value=ast.Call(
+                func=ast.Attribute(value=ast.Name(id="codeflash_con", ctx=ast.Load()), attr="commit", ctx=ast.Load()),
+                args=[],
+                keywords=[],
+            )
+        ),
+    ]
+
+
 def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.FunctionDef:
     lineno = 1
     wrapper_body: list[ast.stmt] = [
@@ -378,76 +474,27 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
             ),
             lineno=lineno + 1,
         ),
-        ast.If(
-            test=ast.UnaryOp(
-                op=ast.Not(),
-                operand=ast.Call(
-                    func=ast.Name(id="hasattr", ctx=ast.Load()),
-                    args=[ast.Name(id="codeflash_wrap", ctx=ast.Load()), ast.Constant(value="index")],
-                    keywords=[],
-                ),
+        ast.Assign(
+            targets=[ast.Name(id="codeflash_test_index", ctx=ast.Store())],
+            value=ast.Call(
+                func=ast.Attribute(value=ast.Name(id="codeflash_index", ctx=ast.Load()), attr="get", ctx=ast.Load()),
+                args=[ast.Name(id="test_id", ctx=ast.Load()), ast.Constant(value=0)],
+                keywords=[],
             ),
-            body=[
-                ast.Assign(
-                    targets=[
-                        ast.Attribute(
-                            value=ast.Name(id="codeflash_wrap", ctx=ast.Load()), attr="index", ctx=ast.Store()
-                        )
-                    ],
-                    value=ast.Dict(keys=[], values=[]),
-                    lineno=lineno + 3,
-                )
-            ],
-            orelse=[],
             lineno=lineno + 2,
         ),
-        ast.If(
-            test=ast.Compare(
-                left=ast.Name(id="test_id", ctx=ast.Load()),
-                ops=[ast.In()],
-                comparators=[
-                    ast.Attribute(value=ast.Name(id="codeflash_wrap", ctx=ast.Load()), attr="index", ctx=ast.Load())
-                ],
-            ),
-            body=[
-                ast.AugAssign(
-                    target=ast.Subscript(
-                        value=ast.Attribute(
-                            value=ast.Name(id="codeflash_wrap", ctx=ast.Load()), attr="index", ctx=ast.Load()
-                        ),
-                        slice=ast.Name(id="test_id", ctx=ast.Load()),
-                        ctx=ast.Store(),
-                    ),
-                    op=ast.Add(),
-                    value=ast.Constant(value=1),
-                    lineno=lineno + 5,
-                )
-            ],
-            orelse=[
-                ast.Assign(
-                    targets=[
-                        ast.Subscript(
-                            value=ast.Attribute(
-                                value=ast.Name(id="codeflash_wrap", ctx=ast.Load()), attr="index", ctx=ast.Load()
-                            ),
-                            slice=ast.Name(id="test_id", ctx=ast.Load()),
-                            ctx=ast.Store(),
-                        )
-                    ],
-                    value=ast.Constant(value=0),
-                    lineno=lineno + 6,
+        ast.Assign(
+            targets=[
+                ast.Subscript(
+                    value=ast.Name(id="codeflash_index", ctx=ast.Load()),
+                    slice=ast.Name(id="test_id", ctx=ast.Load()),
+                    ctx=ast.Store(),
                 )
             ],
-            lineno=lineno + 4,
-        ),
-        ast.Assign(
-            targets=[ast.Name(id="codeflash_test_index", ctx=ast.Store())],
-            value=ast.Subscript(
-                value=ast.Attribute(value=ast.Name(id="codeflash_wrap", ctx=ast.Load()), attr="index", ctx=ast.Load()),
-                slice=ast.Name(id="test_id", ctx=ast.Load()),
-                ctx=ast.Load(),
+            value=ast.BinOp(
+                left=ast.Name(id="codeflash_test_index", ctx=ast.Load()), op=ast.Add(), right=ast.Constant(value=1)
             ),
-            lineno=lineno + 7,
+            lineno=lineno + 3,
         ),
         ast.Assign(
             targets=[ast.Name(id="invocation_id", ctx=ast.Store())],
@@ -522,13 +569,7 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
             body=[
                 ast.Assign(
                     targets=[ast.Name(id="counter", ctx=ast.Store())],
-                    value=ast.Call(
-                        func=ast.Attribute(
-                            value=ast.Name(id="time", ctx=ast.Load()), attr="perf_counter_ns", ctx=ast.Load()
-                        ),
-                        args=[],
-                        keywords=[],
-                    ),
+                    value=ast.Call(func=ast.Name(id="codeflash_perf_counter_ns", ctx=ast.Load()), args=[], keywords=[]),
                     lineno=lineno + 11,
                 ),
                 ast.Assign(
@@ -544,11 +585,7 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
                     targets=[ast.Name(id="codeflash_duration", ctx=ast.Store())],
                     value=ast.BinOp(
                         left=ast.Call(
-                            func=ast.Attribute(
-                                value=ast.Name(id="time", ctx=ast.Load()), attr="perf_counter_ns", ctx=ast.Load()
-                            ),
-                            args=[],
-                            keywords=[],
+                            func=ast.Name(id="codeflash_perf_counter_ns", ctx=ast.Load()), args=[], keywords=[]
                         ),
                         op=ast.Sub(),
                         right=ast.Name(id="counter", ctx=ast.Load()),
@@ -565,13 +602,7 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
                             targets=[ast.Name(id="codeflash_duration", ctx=ast.Store())],
                             value=ast.BinOp(
                                 left=ast.Call(
-                                    func=ast.Attribute(
-                                        value=ast.Name(id="time", ctx=ast.Load()),
-                                        attr="perf_counter_ns",
-                                        ctx=ast.Load(),
-                                    ),
-                                    args=[],
-                                    keywords=[],
+                                    func=ast.Name(id="codeflash_perf_counter_ns", ctx=ast.Load()), args=[], keywords=[]
                                 ),
                                 op=ast.Sub(),
                                 right=ast.Name(id="counter", ctx=ast.Load()),
@@ -651,25 +682,18 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
         ),
         *(
             [
-                ast.Assign(
-                    targets=[ast.Name(id="pickled_return_value", ctx=ast.Store())],
-                    value=ast.IfExp(
-                        test=ast.Name(id="exception", ctx=ast.Load()),
-                        body=ast.Call(
-                            func=ast.Attribute(
-                                value=ast.Name(id="pickle", ctx=ast.Load()), attr="dumps", ctx=ast.Load()
-                            ),
-                            args=[ast.Name(id="exception", ctx=ast.Load())],
-                            keywords=[],
-                        ),
-                        orelse=ast.Call(
-                            func=ast.Attribute(
-                                value=ast.Name(id="pickle", ctx=ast.Load()), attr="dumps", ctx=ast.Load()
-                            ),
-                            args=[ast.Name(id="return_value", ctx=ast.Load())],
-                            keywords=[],
-                        ),
-                    ),
+                # the C pickler is much faster, dill is only needed for what it can't serialize
+                ast.Try(
+                    body=[create_pickled_return_value_assign("pickle")],
+                    handlers=[
+                        ast.ExceptHandler(
+                            type=ast.Name(id="Exception", ctx=ast.Load()),
+                            name=None,
+                            body=[create_pickled_return_value_assign("dill")],
+                        )
+                    ],
+                    orelse=[],
+                    finalbody=[],
                     lineno=lineno + 18,
                 )
             ]
@@ -681,10 +705,9 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
                 ast.Expr(
                     value=ast.Call(
                         func=ast.Attribute(
-                            value=ast.Name(id="codeflash_cur", ctx=ast.Load()), attr="execute", ctx=ast.Load()
+                            value=ast.Name(id="codeflash_rows", ctx=ast.Load()), attr="append", ctx=ast.Load()
                         ),
                         args=[
-                            ast.Constant(value="INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"),
                             ast.Tuple(
                                 elts=[
                                     ast.Name(id="test_module_name", ctx=ast.Load()),
@@ -698,20 +721,24 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
                                     ast.Constant(value=VerificationType.FUNCTION_CALL.value),
                                 ],
                                 ctx=ast.Load(),
-                            ),
+                            )
                         ],
                         keywords=[],
                     ),
                     lineno=lineno + 20,
                 ),
-                ast.Expr(
-                    value=ast.Call(
-                        func=ast.Attribute(
-                            value=ast.Name(id="codeflash_con", ctx=ast.Load()), attr="commit", ctx=ast.Load()
+                ast.If(
+                    test=ast.Compare(
+                        left=ast.Call(
+                            func=ast.Name(id="len", ctx=ast.Load()),
+                            args=[ast.Name(id="codeflash_rows", ctx=ast.Load())],
+                            keywords=[],
                         ),
-                        args=[],
-                        keywords=[],
+                        ops=[ast.GtE()],
+                        comparators=[ast.Constant(value=TEST_RESULTS_BATCH_SIZE)],
                     ),
+                    body=create_flush_rows_statements(),
+                    orelse=[],
                     lineno=lineno + 21,
                 ),
             ]
@@ -743,8 +770,11 @@ def create_wrapper_function(mode: TestingMode = TestingMode.BEHAVIOR) -> ast.Fun
             vararg=ast.arg(arg="args"),
             kwarg=ast.arg(arg="kwargs"),
             posonlyargs=[],
-            kwonlyargs=[],
-            kw_defaults=[],
+            # bound once at definition time so the timed region doesn't include the global and attribute lookups
+            kwonlyargs=[ast.arg(arg="codeflash_perf_counter_ns", annotation=None)],
+            kw_defaults=[
+                ast.Attribute(value=ast.Name(id="time", ctx=ast.Load()), attr="perf_counter_ns", ctx=ast.Load())
+            ],
             defaults=[],
         ),
         body=wrapper_body,
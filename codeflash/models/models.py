@@ -432,11 +432,17 @@ class TestResults(BaseModel):
         except (IndexError, KeyError):
             return None
 
+    def items_by_unique_invocation_loop_id(self) -> Iterator[tuple[str, FunctionTestInvocation]]:
+        """Iterate over (unique invocation loop id, test result) pairs, reusing the ids built by add."""
+        for unique_invocation_loop_id, idx in self.test_result_idx.items():
+            yield unique_invocation_loop_id, self.test_results[idx]
+
     def get_all_ids(self) -> set[InvocationId]:
         return {test_result.id for test_result in self.test_results}
 
     def get_all_unique_invocation_loop_ids(self) -> set[str]:
-        return {test_result.unique_invocation_loop_id for test_result in self.test_results}
+        # the ids were already built when the results were added, don't format them again for every comparison
+        return set(self.test_result_idx)
 
     def number_of_loops(self) -> int:
         if not self.test_results:
@@ -1077,6 +1077,8 @@ class FunctionOptimizer:
                     pytest_timeout=INDIVIDUAL_TESTCASE_TIMEOUT,
                     verbose=True,
                     enable_coverage=enable_coverage,
+                    parallel=self.test_cfg.parallel_behavioral_tests,
+                    fork_server=self.test_cfg.pytest_fork_server,
                 )
             elif testing_type == TestingMode.LINE_PROFILE:
                 result_file_path, run_result = run_line_profile_tests(
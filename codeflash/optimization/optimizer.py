@@ -19,6 +19,7 @@ from codeflash.either import is_successful
 from codeflash.models.models import TestType, ValidCode
 from codeflash.optimization.function_optimizer import FunctionOptimizer
 from codeflash.telemetry.posthog_cf import ph
+from codeflash.verification.test_runner import HAS_XDIST
 from codeflash.verification.verification_utils import TestConfig
 
 if TYPE_CHECKING:
@@ -38,7 +39,14 @@ class Optimizer:
             project_root_path=args.project_root,
             test_framework=args.test_framework,
             pytest_cmd=args.pytest_cmd,
+            parallel_behavioral_tests=getattr(args, "parallel_behavioral_tests", False),
+            pytest_fork_server=getattr(args, "pytest_fork_server", False),
         )
+        if self.test_cfg.parallel_behavioral_tests and not HAS_XDIST:
+            logger.warning(
+                "parallel-behavioral-tests is set but pytest-xdist is not installed, the behavioral tests will run "
+                "serially. Install it with `pip install codeflash[xdist]`."
+            )
 
         self.aiservice_client = AiServiceClient()
         self.experiment_id = os.getenv("CODEFLASH_EXPERIMENT_ID", None)
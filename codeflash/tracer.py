@@ -19,6 +19,7 @@ import os
 import pathlib
 import pickle
 import sqlite3
+import struct
 import sys
 import threading
 import time
@@ -39,12 +40,26 @@ from codeflash.cli_cmds.console import console
 from codeflash.code_utils.code_utils import module_name_from_file_path
 from codeflash.code_utils.config_parser import parse_config_file
 from codeflash.discovery.functions_to_optimize import filter_files_optimized
-from codeflash.tracing.replay_test import create_trace_replay_test
+from codeflash.tracing.replay_test import (
+    DILL_PREFIX,
+    MARSHAL_PREFIX,
+    PICKLE_BUFFERS_COUNT,
+    PICKLE_BUFFERS_PREFIX,
+    PICKLE_PREFIX,
+    create_trace_replay_test,
+)
+from codeflash.tracing.trace_event_log import TraceEventLog
 from codeflash.tracing.tracing_utils import FunctionModules
 from codeflash.verification.verification_utils import get_test_file_path
 
 if TYPE_CHECKING:
-    from types import FrameType, TracebackType
+    from types import CodeType, FrameType, TracebackType
+
+# marshal also accepts any buffer (numpy scalars, bytearray, ...) and silently turns it into bytes, so it is only used
+# when every argument is exactly one of these types
+MARSHAL_SAFE_TYPES = frozenset({int, float, complex, str, bytes, bool, type(None)})
+# calls without arguments (after dropping self for __init__) all share the same serialized blob
+EMPTY_ARGUMENTS_BLOB = MARSHAL_PREFIX + marshal.dumps({})
 
 
 class FakeCode:
@@ -52,7 +67,10 @@ class FakeCode:
         self.co_filename = filename
         self.co_line = line
         self.co_name = name
+        self.co_qualname = name
         self.co_firstlineno = 0
+        self.co_argcount = 0
+        self.co_varnames = ()
 
     def __repr__(self) -> str:
         return repr((self.co_filename, self.co_line, self.co_name, None))
@@ -65,6 +83,77 @@ class FakeFrame:
         self.f_locals: dict = {}
 
 
+def is_method_code(code: CodeType | FakeCode) -> bool:
+    """Check from the code object alone whether the first argument is `self` or `cls`."""
+    return code.co_argcount > 0 and code.co_varnames[0] in {"self", "cls"}
+
+
+# Buffers smaller than this are cheaper to keep inside the pickle than to write out-of-band
+MIN_OUT_OF_BAND_BUFFER_SIZE = 64 * 1024
+
+
+def pickle_arguments(arguments: dict[str, Any]) -> list[bytes | memoryview]:
+    """Pickle the arguments, keeping large contiguous buffers (numpy arrays etc.) out-of-band.
+
+    The out-of-band buffers are returned as memoryviews over the original data, so they can be written to the event
+    log without first being copied into the pickle.
+    """
+    buffers: list[memoryview] = []
+
+    def collect_buffer(buffer: pickle.PickleBuffer) -> bool:
+        try:
+            raw = buffer.raw()
+        except BufferError:
+            # not contiguous, serialize in-band
+            return True
+        if raw.nbytes < MIN_OUT_OF_BAND_BUFFER_SIZE:
+            return True
+        buffers.append(raw)
+        return False
+
+    pickled = pickle.dumps(arguments, protocol=pickle.HIGHEST_PROTOCOL, buffer_callback=collect_buffer)
+    if not buffers:
+        return [PICKLE_PREFIX + pickled]
+    header = PICKLE_BUFFERS_PREFIX + PICKLE_BUFFERS_COUNT.pack(len(buffers))
+    header += struct.pack(f"<{len(buffers) + 1}Q", len(pickled), *(buffer.nbytes for buffer in buffers))
+    return [header, pickled, *buffers]
+
+
+# On 3.11+ the class name only depends on the code object, so it can be cached per code object
+CLASS_NAME_FROM_CODE = sys.version_info >= (3, 11)
+
+if CLASS_NAME_FROM_CODE:
+
+    def get_class_name(frame: FrameType | FakeFrame) -> str | None:
+        """Get the class of a method from its qualified name, without reading frame.f_locals."""
+        code = frame.f_code
+        if not is_method_code(code):
+            return None
+        qualname = code.co_qualname
+        locals_index = qualname.rfind(".<locals>.")
+        if locals_index != -1:
+            qualname = qualname[locals_index + len(".<locals>.") :]
+        parts = qualname.rsplit(".", 2)
+        return parts[-2] if len(parts) > 1 else None
+
+else:
+
+    def get_class_name(frame: FrameType | FakeFrame) -> str | None:
+        """Get the class of a method from its self or cls argument. This can raise if the class overrides getattr."""
+        if not is_method_code(frame.f_code):
+            return None
+        arguments = frame.f_locals
+        if (
+            "self" in arguments
+            and hasattr(arguments["self"], "__class__")
+            and hasattr(arguments["self"].__class__, "__name__")
+        ):
+            return arguments["self"].__class__.__name__
+        if "cls" in arguments and hasattr(arguments["cls"], "__name__"):
+            return arguments["cls"].__name__
+        return None
+
+
 # Debug this file by simply adding print statements. This file is not meant to be debugged by the debugger.
 class Tracer:
     """Use this class as a 'with' context manager to trace a function call.
@@ -109,26 +198,42 @@ class Tracer:
             self.disable = True
             return
         self.con = None
+        self.event_log: TraceEventLog | None = None
+        self.monitoring_tool_id: int | None = None
         self.output_file = Path(output).resolve()
         self.functions = functions
         self.function_modules: list[FunctionModules] = []
+        # (function name, class name, file name) -> id stored in the event log
+        self.function_ids: dict[tuple[str, str | None, str], int] = {}
+        # id(code) -> (code, resolved file or None if never traced, class name, qualified name). The code object is
+        # kept in the entry so that its id cannot be reused while cached.
+        self.code_info: dict[int, tuple[CodeType, Path | None, str | None, str | None]] = {}
         self.function_count = defaultdict(int)
+        # the tracer's own code (e.g. Tracer.__exit__) is never traced, see get_code_info
         self.current_file_path = Path(__file__).resolve()
-        self.ignored_qualified_functions = {
-            f"{self.current_file_path}:Tracer:__exit__",
-            f"{self.current_file_path}:Tracer:__enter__",
-        }
+        self.ignored_qualified_functions: set[str] = set()
         self.max_function_count = max_function_count
+        # Hot functions are sampled: once a function has been recorded sample_start_count times, only every
+        # sample_stride[function]-th call is recorded, and the stride doubles every time the recorded count doubles.
+        self.sample_start_count = max(1, max_function_count // 16)
+        self.max_sample_stride = max(1, max_function_count // 16)
+        self.sample_stride: dict[str, int] = defaultdict(lambda: 1)
+        self.sample_counter: dict[str, int] = defaultdict(int)
         self.config, found_config_path = parse_config_file(config_file_path)
         self.project_root = project_root_from_module_root(Path(self.config["module_root"]), found_config_path)
         console.rule(f"Project Root: {self.project_root}", style="bold blue")
+        # cheap string check on the raw co_filename, so that stdlib and site-packages code is rejected without
+        # resolving its path
+        self.project_root_prefixes = tuple(
+            {str(self.project_root) + os.sep, os.path.realpath(self.project_root) + os.sep}
+        )
         self.ignored_functions = {"<listcomp>", "<genexpr>", "<dictcomp>", "<setcomp>", "<lambda>", "<module>"}
 
         self.file_being_called_from: str = str(Path(sys._getframe().f_back.f_code.co_filename).name).replace(".", "_")  # noqa: SLF001
 
         assert timeout is None or timeout > 0, "Timeout should be greater than 0"
         self.timeout = timeout
-        self.next_insert = 1000
+        self.timed_out = False
         self.trace_count = 0
 
         # Profiler variables
@@ -163,17 +268,32 @@ class Tracer:
         cur = self.con.cursor()
         cur.execute("""PRAGMA synchronous = OFF""")
         cur.execute("""PRAGMA journal_mode = WAL""")
+        cur.execute("""PRAGMA temp_store = MEMORY""")
         # TODO: Check out if we need to export the function test name as well
         cur.execute(
             "CREATE TABLE function_calls(type TEXT, function TEXT, classname TEXT, filename TEXT, "
             "line_number INTEGER, last_frame_address INTEGER, time_ns INTEGER, args BLOB)"
         )
+        # Events are appended to a binary log while tracing and only materialized into SQLite once tracing ends
+        self.event_log = TraceEventLog(self.output_file.with_name(self.output_file.name + ".events"))
         console.rule("Codeflash: Traced Program Output Begin", style="bold blue")
         frame = sys._getframe(0)  # Get this frame and simulate a call to it  # noqa: SLF001
         self.dispatch["call"](self, frame, 0)
         self.start_time = time.time()
-        sys.setprofile(self.trace_callback)
-        threading.setprofile(self.trace_callback)
+        if sys.version_info >= (3, 12) and sys.monitoring.get_tool(sys.monitoring.PROFILER_ID) is None:
+            # With sys.monitoring the tracer can tell the interpreter to stop reporting code objects it will never
+            # record. The profiler still needs every call and return, so it stays on sys.setprofile.
+            self.monitoring_tool_id = sys.monitoring.PROFILER_ID
+            sys.monitoring.use_tool_id(self.monitoring_tool_id, "codeflash")
+            sys.monitoring.register_callback(
+                self.monitoring_tool_id, sys.monitoring.events.PY_START, self.monitoring_start_callback
+            )
+            sys.monitoring.set_events(self.monitoring_tool_id, sys.monitoring.events.PY_START)
+            sys.setprofile(self.profile_callback)
+            threading.setprofile(self.profile_callback)
+        else:
+            sys.setprofile(self.trace_callback)
+            threading.setprofile(self.trace_callback)
 
     def __exit__(
         self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None
@@ -181,7 +301,14 @@ class Tracer:
         if self.disable:
             return
         sys.setprofile(None)
-        self.con.commit()
+        threading.setprofile(None)
+        if self.monitoring_tool_id is not None:
+            sys.monitoring.set_events(self.monitoring_tool_id, 0)
+            sys.monitoring.register_callback(self.monitoring_tool_id, sys.monitoring.events.PY_START, None)
+            sys.monitoring.free_tool_id(self.monitoring_tool_id)
+        self.event_log.close()
+        self.write_function_calls()
+        self.event_log.remove()
         console.rule("Codeflash: Traced Program Output End", style="bold blue")
         self.create_stats()
 
@@ -191,17 +318,27 @@ class Tracer:
             "call_count_nonrecursive INTEGER, num_callers INTEGER, total_time_ns INTEGER, "
             "cumulative_time_ns INTEGER, callers BLOB)"
         )
-        for func, (cc, nc, tt, ct, callers) in self.stats.items():
-            remapped_callers = [{"key": k, "value": v} for k, v in callers.items()]
-            cur.execute(
-                "INSERT INTO pstats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (str(Path(func[0]).resolve()), func[1], func[2], func[3], cc, nc, tt, ct, json.dumps(remapped_callers)),
-            )
-        self.con.commit()
+        cur.executemany(
+            "INSERT INTO pstats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    str(Path(func[0]).resolve()),
+                    func[1],
+                    func[2],
+                    func[3],
+                    cc,
+                    nc,
+                    tt,
+                    ct,
+                    json.dumps([{"key": k, "value": v} for k, v in callers.items()]),
+                )
+                for func, (cc, nc, tt, ct, callers) in self.stats.items()
+            ),
+        )
 
         self.make_pstats_compatible()
         self.print_stats("tottime")
-        cur = self.con.cursor()
+        # pstats and total_time go out in a single transaction
         cur.execute("CREATE TABLE total_time (time_ns INTEGER)")
         cur.execute("INSERT INTO total_time VALUES (?)", (self.total_tt,))
         self.con.commit()
@@ -242,47 +379,50 @@ class Tracer:
             overflow="ignore",
         )
 
-    def tracer_logic(self, frame: FrameType, event: str) -> None:
+    def tracer_logic(self, frame: FrameType, event: str) -> bool:
+        """Record the arguments of a traced call.
+
+        Returns False when calls to this code object will never be recorded, so that callers which can stop
+        dispatching events for it (sys.monitoring) do so.
+        """
         if event != "call":
-            return
+            return True
+        if self.timed_out:
+            return False
         if self.timeout is not None and (time.time() - self.start_time) > self.timeout:
+            # sys.setprofile only detaches the current thread, other threads keep calling in until they finish
+            self.timed_out = True
             sys.setprofile(None)
             threading.setprofile(None)
+            if self.monitoring_tool_id is not None:
+                sys.monitoring.set_events(self.monitoring_tool_id, 0)
             console.print(f"Codeflash: Timeout reached! Stopping tracing at {self.timeout} seconds.")
-            return
+            return True
         code = frame.f_code
-
-        file_name = Path(code.co_filename).resolve()
         # TODO : It currently doesn't log the last return call from the first function
 
-        if code.co_name in self.ignored_functions:
-            return
-        if not file_name.is_relative_to(self.project_root):
-            return
-        if not file_name.exists():
-            return
-        if self.functions and code.co_name not in self.functions:
-            return
-        class_name = None
-        arguments = frame.f_locals
-        try:
-            if (
-                "self" in arguments
-                and hasattr(arguments["self"], "__class__")
-                and hasattr(arguments["self"].__class__, "__name__")
-            ):
-                class_name = arguments["self"].__class__.__name__
-            elif "cls" in arguments and hasattr(arguments["cls"], "__name__"):
-                class_name = arguments["cls"].__name__
-        except:  # noqa: E722
-            # someone can override the getattr method and raise an exception. I'm looking at you wrapt
-            return
-        function_qualified_name = f"{file_name}:{(class_name + ':' if class_name else '')}{code.co_name}"
-        if function_qualified_name in self.ignored_qualified_functions:
-            return
-        if function_qualified_name not in self.function_count:
+        code_id = id(code)
+        code_info = self.code_info.get(code_id)
+        if code_info is None:
+            code_info = self.code_info[code_id] = self.get_code_info(frame)
+        _, file_name, class_name, function_qualified_name = code_info
+        if file_name is None:
+            return False
+        if function_qualified_name is None:
+            try:
+                class_name = get_class_name(frame)
+            except:  # noqa: E722
+                # someone can override the getattr method and raise an exception. I'm looking at you wrapt
+                return True
+            function_qualified_name = f"{file_name}:{(class_name + ':' if class_name else '')}{code.co_name}"
+        ignored_qualified_functions = self.ignored_qualified_functions
+        if function_qualified_name in ignored_qualified_functions:
+            return False
+        # locals for the attributes used on every sampled call
+        function_count = self.function_count
+        if function_qualified_name not in function_count:
             # seeing this function for the first time
-            self.function_count[function_qualified_name] = 0
+            function_count[function_qualified_name] = 0
             file_valid = filter_files_optimized(
                 file_path=file_name,
                 tests_root=Path(self.config["tests_root"]),
@@ -291,8 +431,8 @@ class Tracer:
             )
             if not file_valid:
                 # we don't want to trace this function because it cannot be optimized
-                self.ignored_qualified_functions.add(function_qualified_name)
-                return
+                ignored_qualified_functions.add(function_qualified_name)
+                return False
             self.function_modules.append(
                 FunctionModules(
                     function_name=code.co_name,
@@ -303,56 +443,101 @@ class Tracer:
                 )
             )
         else:
-            self.function_count[function_qualified_name] += 1
-            if self.function_count[function_qualified_name] >= self.max_function_count:
-                self.ignored_qualified_functions.add(function_qualified_name)
-                return
+            sample_counter = self.sample_counter
+            sample_stride = self.sample_stride
+            call_number = sample_counter[function_qualified_name] + 1
+            sample_counter[function_qualified_name] = call_number
+            stride = sample_stride[function_qualified_name]
+            if call_number % stride:
+                return True
+            recorded_count = function_count[function_qualified_name] + 1
+            function_count[function_qualified_name] = recorded_count
+            if recorded_count >= self.max_function_count:
+                ignored_qualified_functions.add(function_qualified_name)
+                return False
+            if (
+                recorded_count >= self.sample_start_count
+                and recorded_count & (recorded_count - 1) == 0
+                and stride < self.max_sample_stride
+            ):
+                sample_stride[function_qualified_name] = stride * 2
 
         # TODO: Also check if this function arguments are unique from the values logged earlier
 
-        cur = self.con.cursor()
-
+        # frame.f_locals builds a new dict on every access, so it is only read once the call is actually recorded
+        arguments = frame.f_locals
         t_ns = time.perf_counter_ns()
-        original_recursion_limit = sys.getrecursionlimit()
-        try:
-            # pickling can be a recursive operator, so we need to increase the recursion limit
-            sys.setrecursionlimit(10000)
-            # We do not pickle self for __init__ to avoid recursion errors, and instead instantiate its class
-            # directly with the rest of the arguments in the replay tests. We copy the arguments to avoid memory
-            # leaks, bad references or side effects when unpickling.
-            arguments = dict(arguments.items())
-            if class_name and code.co_name == "__init__":
-                del arguments["self"]
-            local_vars = pickle.dumps(arguments, protocol=pickle.HIGHEST_PROTOCOL)
-            sys.setrecursionlimit(original_recursion_limit)
-        except (TypeError, pickle.PicklingError, AttributeError, RecursionError, OSError):
-            # we retry with dill if pickle fails. It's slower but more comprehensive
+        # We do not pickle self for __init__ to avoid recursion errors, and instead instantiate its class directly with
+        # the rest of the arguments in the replay tests. We copy the arguments to avoid memory leaks, bad references or
+        # side effects when unpickling.
+        arguments = dict(arguments.items())
+        if class_name and code.co_name == "__init__":
+            del arguments["self"]
+        if not arguments:
+            blob_parts = [EMPTY_ARGUMENTS_BLOB]
+        elif all(type(value) in MARSHAL_SAFE_TYPES for value in arguments.values()):
+            # marshal is several times faster than pickle for plain builtin values, and a flat dict of them cannot
+            # recurse, so the recursion limit is left alone
+            blob_parts = [MARSHAL_PREFIX + marshal.dumps(arguments)]
+        else:
+            original_recursion_limit = sys.getrecursionlimit()
             try:
-                local_vars = dill.dumps(arguments, protocol=dill.HIGHEST_PROTOCOL)
+                # pickling can be a recursive operator, so we need to increase the recursion limit
+                sys.setrecursionlimit(10000)
+                blob_parts = pickle_arguments(arguments)
                 sys.setrecursionlimit(original_recursion_limit)
+            except (TypeError, pickle.PicklingError, AttributeError, RecursionError, OSError):
+                # we retry with dill if pickle fails. It's slower but more comprehensive
+                try:
+                    blob_parts = [DILL_PREFIX + dill.dumps(arguments, protocol=dill.HIGHEST_PROTOCOL)]
+                    sys.setrecursionlimit(original_recursion_limit)
+
+                except (TypeError, dill.PicklingError, AttributeError, RecursionError, OSError):
+                    # give up
+                    self.function_count[function_qualified_name] -= 1
+                    return True
+        function_key = (code.co_name, class_name, str(file_name))
+        function_id = self.function_ids.get(function_key)
+        if function_id is None:
+            function_id = self.function_ids[function_key] = len(self.function_ids)
+        caller = frame.f_back
+        caller_address = 0 if caller is None else id(caller)
+        self.event_log.append(event, function_id, frame.f_lineno, caller_address, t_ns, *blob_parts)
+        self.trace_count += 1
+        return True
 
-            except (TypeError, dill.PicklingError, AttributeError, RecursionError, OSError):
-                # give up
-                self.function_count[function_qualified_name] -= 1
-                return
-        cur.execute(
+    def get_code_info(self, frame: FrameType) -> tuple[CodeType, Path | None, str | None, str | None]:
+        """Work out once per code object whether it can be traced, and its class and qualified name when possible."""
+        code = frame.f_code
+        if code.co_name in self.ignored_functions or (self.functions and code.co_name not in self.functions):
+            return code, None, None, None
+        co_filename = code.co_filename
+        if os.path.isabs(co_filename) and not co_filename.startswith(self.project_root_prefixes):  # noqa: PTH117
+            return code, None, None, None
+        file_name = Path(co_filename).resolve()
+        if (
+            file_name == self.current_file_path
+            or not file_name.is_relative_to(self.project_root)
+            or not file_name.exists()
+        ):
+            return code, None, None, None
+        if not CLASS_NAME_FROM_CODE:
+            return code, file_name, None, None
+        class_name = get_class_name(frame)
+        return code, file_name, class_name, f"{file_name}:{(class_name + ':' if class_name else '')}{code.co_name}"
+
+    def write_function_calls(self) -> None:
+        """Materialize the event log into the function_calls table read by the replay tests."""
+        function_keys = list(self.function_ids)
+        cur = self.con.cursor()
+        cur.executemany(
             "INSERT INTO function_calls VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
             (
-                event,
-                code.co_name,
-                class_name,
-                str(file_name),
-                frame.f_lineno,
-                frame.f_back.__hash__(),
-                t_ns,
-                local_vars,
+                (event, *function_keys[function_id], line_number, frame_address, t_ns, local_vars)
+                for event, function_id, line_number, frame_address, t_ns, local_vars in self.event_log.iter_events()
             ),
         )
-        self.trace_count += 1
-        self.next_insert -= 1
-        if self.next_insert == 0:
-            self.next_insert = 1000
-            self.con.commit()
+        self.con.commit()
 
     def trace_callback(self, frame: FrameType, event: str, arg: str | None) -> None:
         # profiler section
@@ -370,6 +555,26 @@ class Tracer:
         else:
             self.t = timer() - t  # put back unrecorded delta
 
+    def profile_callback(self, frame: FrameType, event: str, arg: str | None) -> None:
+        # profiler only, the tracer section runs from monitoring_start_callback
+        timer = self.timer
+        t = timer() - self.t - self.bias
+        if event == "c_call":
+            self.c_func_name = arg.__name__
+
+        if self.dispatch[event](self, frame, t):
+            self.t = timer()
+        else:
+            self.t = timer() - t  # put back unrecorded delta
+
+    def monitoring_start_callback(self, code: CodeType, instruction_offset: int) -> object:  # noqa: ARG002
+        timer = self.timer
+        start = timer()
+        keep_tracing = self.tracer_logic(sys._getframe(1), "call")  # noqa: SLF001
+        # leave the time spent recording out of the profile of the traced function
+        self.t += timer() - start
+        return None if keep_tracing else sys.monitoring.DISABLE
+
     def trace_dispatch_call(self, frame: FrameType, t: int) -> int:
         """Handle call events in the profiler."""
         try:
@@ -389,19 +594,10 @@ class Tracer:
 
             # Get function information
             fcode = frame.f_code
-            arguments = frame.f_locals
-            class_name = None
             try:
-                if (
-                    "self" in arguments
-                    and hasattr(arguments["self"], "__class__")
-                    and hasattr(arguments["self"].__class__, "__name__")
-                ):
-                    class_name = arguments["self"].__class__.__name__
-                elif "cls" in arguments and hasattr(arguments["cls"], "__name__"):
-                    class_name = arguments["cls"].__name__
-            except Exception:  # noqa: BLE001, S110
-                pass
+                class_name = get_class_name(frame)
+            except Exception:  # noqa: BLE001
+                class_name = None
 
             fn = (fcode.co_filename, fcode.co_firstlineno, fcode.co_name, class_name)
             self.cur = (t, 0, 0, fn, frame, self.cur)
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import marshal
 import sqlite3
+import struct
 import textwrap
 from collections.abc import Generator
 from typing import Any, Optional
 
+import dill
+
 from codeflash.discovery.functions_to_optimize import FunctionProperties, inspect_top_level_functions_or_methods
 from codeflash.tracing.tracing_utils import FunctionModules
 
@@ -35,6 +39,41 @@ def get_next_arg_and_return(
             raise ValueError(msg)
 
 
+# The tracer prefixes the serialized arguments with the serializer that was used
+MARSHAL_PREFIX = b"M"
+PICKLE_PREFIX = b"P"
+DILL_PREFIX = b"D"
+# pickle with out-of-band buffers: buffer count, then the byte length of the pickle and of every buffer, then the
+# pickle followed by the buffers
+PICKLE_BUFFERS_PREFIX = b"B"
+PICKLE_BUFFERS_COUNT = struct.Struct("<I")
+
+
+def load_traced_arguments(arg_val_pkl: bytes) -> dict[str, Any]:
+    prefix, payload = arg_val_pkl[:1], arg_val_pkl[1:]
+    if prefix == MARSHAL_PREFIX:
+        return marshal.loads(payload)
+    if prefix in {PICKLE_PREFIX, DILL_PREFIX}:
+        return dill.loads(payload)
+    if prefix == PICKLE_BUFFERS_PREFIX:
+        (buffer_count,) = PICKLE_BUFFERS_COUNT.unpack_from(arg_val_pkl, 1)
+        lengths_format = f"<{buffer_count + 1}Q"
+        offset = 1 + PICKLE_BUFFERS_COUNT.size
+        pickle_length, *buffer_lengths = struct.unpack_from(lengths_format, arg_val_pkl, offset)
+        offset += struct.calcsize(lengths_format)
+        data = memoryview(arg_val_pkl)
+        pickled = data[offset : offset + pickle_length]
+        offset += pickle_length
+        buffers = []
+        for buffer_length in buffer_lengths:
+            # copied into bytearrays so that the reconstructed arrays are writable
+            buffers.append(bytearray(data[offset : offset + buffer_length]))
+            offset += buffer_length
+        return dill.loads(pickled, buffers=buffers)
+    # trace files written before the serializer prefix was added hold the bare pickle
+    return dill.loads(arg_val_pkl)
+
+
 def get_function_alias(module: str, function_name: str) -> str:
     return "_".join(module.split(".")) + "_" + function_name
 
@@ -44,9 +83,8 @@ def create_trace_replay_test(
 ) -> str:
     assert test_framework in {"pytest", "unittest"}
 
-    imports = f"""import dill as pickle
-{"import unittest" if test_framework == "unittest" else ""}
-from codeflash.tracing.replay_test import get_next_arg_and_return
+    imports = f"""{"import unittest" if test_framework == "unittest" else ""}
+from codeflash.tracing.replay_test import get_next_arg_and_return, load_traced_arguments
 """
 
     # TODO: Module can have "-" character if the module-root is ".". Need to handle that case
@@ -85,21 +123,21 @@ trace_file_path = r"{trace_file}"
     test_function_body = textwrap.dedent(
         """\
         for arg_val_pkl in get_next_arg_and_return(trace_file=trace_file_path, function_name="{orig_function_name}", file_name=r"{file_name}", num_to_get={max_run_count}):
-            args = pickle.loads(arg_val_pkl)
+            args = load_traced_arguments(arg_val_pkl)
             ret = {function_name}({args})
             """
     )
     test_class_method_body = textwrap.dedent(
         """\
         for arg_val_pkl in get_next_arg_and_return(trace_file=trace_file_path, function_name="{orig_function_name}", file_name=r"{file_name}", class_name="{class_name}", num_to_get={max_run_count}):
-            args = pickle.loads(arg_val_pkl){filter_variables}
+            args = load_traced_arguments(arg_val_pkl){filter_variables}
             ret = {class_name_alias}{method_name}(**args)
             """
     )
     test_class_staticmethod_body = textwrap.dedent(
         """\
         for arg_val_pkl in get_next_arg_and_return(trace_file=trace_file_path, function_name="{orig_function_name}", file_name=r"{file_name}", num_to_get={max_run_count}):
-            args = pickle.loads(arg_val_pkl){filter_variables}
+            args = load_traced_arguments(arg_val_pkl){filter_variables}
             ret = {class_name_alias}{method_name}(**args)
             """
     )
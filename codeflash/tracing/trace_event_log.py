@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import shutil
+import struct
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+# event code, function id, line number, caller frame address, time in ns, blob offset, blob length
+EVENT_RECORD = struct.Struct("<BIIqQQQ")
+EVENT_CODES = {"call": 0, "return": 1}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+
+
+class TraceEventLog:
+    """Append-only, columnar log of trace events.
+
+    Fixed-width event records go to `events.meta` and the pickled arguments are concatenated into `events.blobs`, so
+    recording an event is two sequential buffered writes instead of a SQLite INSERT.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.meta_path = directory / "events.meta"
+        self.blobs_path = directory / "events.blobs"
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True)
+        self.meta = self.meta_path.open("wb")
+        self.blobs = self.blobs_path.open("wb")
+        self.blob_offset = 0
+        # the tracer also runs in other threads, the record and its blob must be written together
+        self.lock = threading.Lock()
+
+    def append(
+        self,
+        event: str,
+        function_id: int,
+        line_number: int,
+        frame_address: int,
+        t_ns: int,
+        *blob_parts: bytes | memoryview,
+    ) -> None:
+        """Append an event, its blob can be given in parts (e.g. pickle out-of-band buffers) to avoid joining them."""
+        blob_len = sum(part.nbytes if isinstance(part, memoryview) else len(part) for part in blob_parts)
+        with self.lock:
+            self.meta.write(
+                EVENT_RECORD.pack(
+                    EVENT_CODES[event], function_id, line_number, frame_address, t_ns, self.blob_offset, blob_len
+                )
+            )
+            for part in blob_parts:
+                self.blobs.write(part)
+            self.blob_offset += blob_len
+
+    def close(self) -> None:
+        self.meta.close()
+        self.blobs.close()
+
+    def iter_events(self) -> Iterator[tuple[str, int, int, int, int, bytes]]:
+        """Read the log back sequentially, yielding (event, function_id, line_number, frame_address, t_ns, blob)."""
+        with self.meta_path.open("rb") as meta, self.blobs_path.open("rb") as blobs:
+            for code, function_id, line_number, frame_address, t_ns, blob_offset, blob_len in EVENT_RECORD.iter_unpack(
+                meta.read()
+            ):
+                if blobs.tell() != blob_offset:
+                    blobs.seek(blob_offset)
+                yield EVENT_NAMES[code], function_id, line_number, frame_address, t_ns, blobs.read(blob_len)
+
+    def remove(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
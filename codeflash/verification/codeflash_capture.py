@@ -4,11 +4,12 @@ import functools
 import gc
 import inspect
 import os
+import pickle
 import sqlite3
 import time
 from pathlib import Path
 
-import dill as pickle
+import dill
 
 from codeflash.models.models import VerificationType
 
@@ -109,6 +110,7 @@ def codeflash_capture(function_name: str, tmp_dir_path: str, tests_root: str, is
             # Connect to sqlite
             codeflash_con = sqlite3.connect(f"{tmp_dir_path}_{codeflash_iteration}.sqlite")
             codeflash_cur = codeflash_con.cursor()
+            codeflash_cur.execute("PRAGMA synchronous = OFF")
 
             # Record timing information
             exception = None
@@ -135,7 +137,10 @@ def codeflash_capture(function_name: str, tmp_dir_path: str, tests_root: str, is
             )
 
             # Write to sqlite
-            pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(instance_state)
+            try:
+                pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(instance_state)
+            except Exception:  # noqa: BLE001
+                pickled_return_value = dill.dumps(exception) if exception else dill.dumps(instance_state)
             codeflash_cur.execute(
                 "INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
                 (
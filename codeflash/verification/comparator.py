@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import ast
 import datetime
 import decimal
@@ -5,12 +7,15 @@ import enum
 import math
 import re
 import types
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import sentry_sdk
 
 from codeflash.cli_cmds.console import logger
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
 try:
     import numpy as np
 
@@ -51,9 +56,140 @@ except ImportError:
     HAS_TORCH = False
 
 
+# sentinel for attributes missing on the new object, which can legitimately hold None
+MISSING = object()
+
+EQUALITY_COMPARED_TYPES = (
+    str,
+    int,
+    bool,
+    complex,
+    type(None),
+    type(Ellipsis),
+    decimal.Decimal,
+    set,
+    bytes,
+    bytearray,
+    memoryview,
+    frozenset,
+    enum.Enum,
+    type,
+)
+
+
+def compare_equal(orig: Any, new: Any, superset_obj: bool) -> bool:  # noqa: ANN401, ARG001, FBT001
+    return orig == new
+
+
+def compare_floats(orig: float, new: float, superset_obj: bool) -> bool:  # noqa: ARG001, FBT001
+    if math.isnan(orig) and math.isnan(new):
+        return True
+    return math.isclose(orig, new)
+
+
+def compare_sequences(orig: list | tuple, new: list | tuple, superset_obj: bool) -> bool:  # noqa: FBT001
+    if len(orig) != len(new):
+        return False
+    return all(comparator(elem1, elem2, superset_obj) for elem1, elem2 in zip(orig, new))
+
+
+def compare_dicts(orig: dict, new: dict, superset_obj: bool) -> bool:  # noqa: FBT001
+    if superset_obj:
+        return all(k in new and comparator(v, new[k], superset_obj) for k, v in orig.items())
+    if len(orig) != len(new):
+        return False
+    for key, value in orig.items():
+        if key not in new:
+            return False
+        if not comparator(value, new[key], superset_obj):
+            return False
+    return True
+
+
+def compare_numpy_arrays(orig: np.ndarray, new: np.ndarray, superset_obj: bool) -> bool:  # noqa: FBT001
+    if orig.dtype != new.dtype:
+        return False
+    if orig.shape != new.shape:
+        return False
+    try:
+        return np.allclose(orig, new, equal_nan=True)
+    except Exception:  # noqa: S110
+        # fails at "ufunc 'isfinite' not supported for the input types"
+        pass
+    # Exact equality settles non-numeric arrays (strings, datetimes, ...) in one vectorized pass. Object arrays can hold
+    # values that are == but of different types (1 and 1.0), which comparator tells apart, so they skip this.
+    if orig.dtype != object and np.array_equal(orig, new):
+        return True
+    return all(comparator(x, y, superset_obj) for x, y in zip(orig.flat, new.flat))
+
+
+def compare_numpy_scalars(orig: np.generic, new: np.generic, superset_obj: bool) -> bool:  # noqa: ARG001, FBT001
+    # np.isclose(orig, new, equal_nan=True) with its default tolerances, computed on the scalars instead of going
+    # through 0-d arrays. NaN equals NaN like in compare_floats, so the result doesn't depend on object identity.
+    if np.isfinite(orig) and np.isfinite(new):
+        return abs(orig - new) <= 1e-08 + 1e-05 * abs(new)
+    if np.isnan(orig) and np.isnan(new):
+        return True
+    return orig == new
+
+
+# Arrays that fully describe a sparse matrix of the given format, for matrices of the same shape and dtype
+SPARSE_STORAGE_ATTRIBUTES = {
+    "csr": ("indptr", "indices", "data"),
+    "csc": ("indptr", "indices", "data"),
+    "bsr": ("indptr", "indices", "data"),
+    "coo": ("row", "col", "data"),
+    "dia": ("offsets", "data"),
+}
+
+
+def sparse_storage_equal(orig: scipy.sparse.spmatrix, new: scipy.sparse.spmatrix) -> bool:
+    """Whether both sparse matrices store identical arrays, which makes them equal without an elementwise comparison.
+
+    Equal matrices can still be stored differently (unsorted indices, explicit zeros, duplicates), so False is not
+    conclusive.
+    """
+    attributes = SPARSE_STORAGE_ATTRIBUTES.get(orig.format)
+    if attributes is None or new.format != orig.format:
+        return False
+    return all(np.array_equal(getattr(orig, attribute), getattr(new, attribute)) for attribute in attributes)
+
+
+# When both objects are exactly one of these types, the comparison is dispatched directly instead of going through the
+# isinstance checks in comparator. Subclasses still take the slow path.
+EXACT_TYPE_COMPARATORS: dict[type, Callable[[Any, Any, bool], bool]] = {
+    **dict.fromkeys((t for t in EQUALITY_COMPARED_TYPES if t is not enum.Enum), compare_equal),
+    **dict.fromkeys(
+        (datetime.datetime, datetime.date, datetime.timedelta, datetime.time, datetime.timezone, re.Pattern),
+        compare_equal,
+    ),
+    float: compare_floats,
+    list: compare_sequences,
+    tuple: compare_sequences,
+    dict: compare_dicts,
+}
+if HAS_NUMPY:
+    EXACT_TYPE_COMPARATORS[np.ndarray] = compare_numpy_arrays
+    # numpy scalars get the comparison the isinstance chain would pick, without first going through the sqlalchemy,
+    # dict and array checks. float64 and complex128 subclass float and complex, so they compare like the builtins.
+    EXACT_TYPE_COMPARATORS.update(
+        dict.fromkeys((t for t in np.sctypeDict.values() if issubclass(t, (np.integer, np.bool_))), compare_equal)
+    )
+    EXACT_TYPE_COMPARATORS.update(
+        dict.fromkeys((np.float16, np.float32, np.longdouble, np.complex64), compare_numpy_scalars)
+    )
+    EXACT_TYPE_COMPARATORS[np.float64] = compare_floats
+    EXACT_TYPE_COMPARATORS[np.complex128] = compare_equal
+
+
 def comparator(orig: Any, new: Any, superset_obj=False) -> bool:
     """Compare two objects for equality recursively. If superset_obj is True, the new object is allowed to have more keys than the original object. However, the existing keys/values must be equivalent."""
     try:
+        if orig is new:
+            return True
+        compare = EXACT_TYPE_COMPARATORS.get(type(orig))
+        if compare is not None and type(new) is type(orig):
+            return compare(orig, new, superset_obj)
         if type(orig) is not type(new):
             type_obj = type(orig)
             new_type_obj = type(new)
@@ -61,34 +197,12 @@ def comparator(orig: Any, new: Any, superset_obj=False) -> bool:
             if type_obj.__name__ != new_type_obj.__name__ or type_obj.__qualname__ != new_type_obj.__qualname__:
                 return False
         if isinstance(orig, (list, tuple)):
-            if len(orig) != len(new):
-                return False
-            return all(comparator(elem1, elem2, superset_obj) for elem1, elem2 in zip(orig, new))
+            return compare_sequences(orig, new, superset_obj)
 
-        if isinstance(
-            orig,
-            (
-                str,
-                int,
-                bool,
-                complex,
-                type(None),
-                type(Ellipsis),
-                decimal.Decimal,
-                set,
-                bytes,
-                bytearray,
-                memoryview,
-                frozenset,
-                enum.Enum,
-                type,
-            ),
-        ):
+        if isinstance(orig, EQUALITY_COMPARED_TYPES):
             return orig == new
         if isinstance(orig, float):
-            if math.isnan(orig) and math.isnan(new):
-                return True
-            return math.isclose(orig, new)
+            return compare_floats(orig, new, superset_obj)
         if isinstance(orig, BaseException):
             # if str(orig) != str(new):
             #     return False
@@ -97,47 +211,29 @@ def comparator(orig: Any, new: Any, superset_obj=False) -> bool:
             new_dict = {k: v for k, v in new.__dict__.items() if not k.startswith("_")}
             return comparator(orig_dict, new_dict, superset_obj)
 
-        if HAS_SQLALCHEMY:
-            try:
-                insp = sqlalchemy.inspection.inspect(orig)
-                insp = sqlalchemy.inspection.inspect(new)
-                orig_keys = orig.__dict__
-                new_keys = new.__dict__
-                for key in list(orig_keys.keys()):
-                    if key.startswith("_"):
-                        continue
-                    if key not in new_keys or not comparator(orig_keys[key], new_keys[key], superset_obj):
-                        return False
-                return True
-
-            except sqlalchemy.exc.NoInspectionAvailable:
-                pass
-        # scipy condition because dok_matrix type is also a instance of dict, but dict comparison doesn't work for it
-        if isinstance(orig, dict) and not (HAS_SCIPY and isinstance(orig, scipy.sparse.spmatrix)):
-            if superset_obj:
-                return all(k in new.keys() and comparator(v, new[k], superset_obj) for k, v in orig.items())
-            if len(orig) != len(new):
-                return False
-            for key in orig:
-                if key not in new:
-                    return False
-                if not comparator(orig[key], new[key], superset_obj):
+        # raiseerr=False returns None for objects SQLAlchemy doesn't know, instead of raising NoInspectionAvailable
+        if (
+            HAS_SQLALCHEMY
+            and sqlalchemy.inspection.inspect(orig, raiseerr=False) is not None
+            and sqlalchemy.inspection.inspect(new, raiseerr=False) is not None
+        ):
+            new_keys = new.__dict__
+            for key, orig_value in orig.__dict__.items():
+                if key.startswith("_"):
+                    continue
+                new_value = new_keys.get(key, MISSING)
+                if new_value is MISSING or not comparator(orig_value, new_value, superset_obj):
                     return False
             return True
+        # scipy condition because dok_matrix type is also a instance of dict, but dict comparison doesn't work for it
+        if isinstance(orig, dict) and not (HAS_SCIPY and isinstance(orig, scipy.sparse.spmatrix)):
+            return compare_dicts(orig, new, superset_obj)
 
         if HAS_NUMPY and isinstance(orig, np.ndarray):
-            if orig.dtype != new.dtype:
-                return False
-            if orig.shape != new.shape:
-                return False
-            try:
-                return np.allclose(orig, new, equal_nan=True)
-            except Exception:
-                # fails at "ufunc 'isfinite' not supported for the input types"
-                return np.all([comparator(x, y, superset_obj) for x, y in zip(orig, new)])
+            return compare_numpy_arrays(orig, new, superset_obj)
 
         if HAS_NUMPY and isinstance(orig, (np.floating, np.complex64, np.complex128)):
-            return np.isclose(orig, new)
+            return np.isclose(orig, new, equal_nan=True)
 
         if HAS_NUMPY and isinstance(orig, (np.integer, np.bool_, np.byte)):
             return orig == new
@@ -147,6 +243,9 @@ def comparator(orig: Any, new: Any, superset_obj=False) -> bool:
                 return False
             if orig.get_shape() != new.get_shape():
                 return False
+            # != builds a whole result matrix, converting either operand to csr unless both are csr or csc
+            if sparse_storage_equal(orig, new):
+                return True
             return (orig != new).nnz == 0
 
         if HAS_PANDAS and isinstance(
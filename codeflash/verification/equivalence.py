@@ -14,16 +14,11 @@ def compare_test_results(original_results: TestResults, candidate_results: TestR
     original_recursion_limit = sys.getrecursionlimit()
     if original_recursion_limit < INCREASED_RECURSION_LIMIT:
         sys.setrecursionlimit(INCREASED_RECURSION_LIMIT)  # Increase recursion limit to avoid RecursionError
-    test_ids_superset = original_results.get_all_unique_invocation_loop_ids().union(
-        set(candidate_results.get_all_unique_invocation_loop_ids())
-    )
     are_equal: bool = True
     did_all_timeout: bool = True
-    for test_id in test_ids_superset:
-        original_test_result = original_results.get_by_unique_invocation_loop_id(test_id)
+    # results that only the candidate produced are not compared, so only the original ids need to be walked
+    for test_id, original_test_result in original_results.items_by_unique_invocation_loop_id():
         cdd_test_result = candidate_results.get_by_unique_invocation_loop_id(test_id)
-        if cdd_test_result is not None and original_test_result is None:
-            continue
         # If helper function instance_state verification is not present, that's ok. continue
         if (
             original_test_result.verification_type
@@ -31,7 +26,7 @@ def compare_test_results(original_results: TestResults, candidate_results: TestR
             and cdd_test_result is None
         ):
             continue
-        if original_test_result is None or cdd_test_result is None:
+        if cdd_test_result is None:
             are_equal = False
             break
         did_all_timeout = did_all_timeout and original_test_result.timed_out
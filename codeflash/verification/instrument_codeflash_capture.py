@@ -24,7 +24,7 @@ def instrument_codeflash_capture(
         and class_parent.name in file_path_to_helper_class[function_to_optimize.file_path]
     ):
         file_path_to_helper_class[function_to_optimize.file_path].remove(class_parent.name)
-    # Instrument fto class
+    # Instrument fto class, along with the helper classes from the same file so that it is only rewritten once
     original_code = function_to_optimize.file_path.read_text(encoding="utf-8")
     # Add decorator to init
     modified_code = add_codeflash_capture_to_init(
@@ -34,11 +34,15 @@ def instrument_codeflash_capture(
         code=original_code,
         tests_root=tests_root,
         is_fto=True,
+        helper_classes=file_path_to_helper_class.get(function_to_optimize.file_path, set()),
     )
-    function_to_optimize.file_path.write_text(modified_code, encoding="utf-8")
+    if modified_code is not None:
+        function_to_optimize.file_path.write_text(modified_code, encoding="utf-8")
 
     # Instrument helper classes
     for file_path, helper_classes in file_path_to_helper_class.items():
+        if file_path == function_to_optimize.file_path:
+            continue
         original_code = file_path.read_text(encoding="utf-8")
         modified_code = add_codeflash_capture_to_init(
             target_classes=helper_classes,
@@ -48,18 +52,35 @@ def instrument_codeflash_capture(
             tests_root=tests_root,
             is_fto=False,
         )
-        file_path.write_text(modified_code, encoding="utf-8")
+        if modified_code is not None:
+            file_path.write_text(modified_code, encoding="utf-8")
 
 
 def add_codeflash_capture_to_init(
-    target_classes: set[str], fto_name: str, tmp_dir_path: str, code: str, tests_root: Path, is_fto: bool = False
-) -> str:
-    """Add codeflash_capture decorator to __init__ function in the specified class."""
+    target_classes: set[str],
+    fto_name: str,
+    tmp_dir_path: str,
+    code: str,
+    tests_root: Path,
+    is_fto: bool = False,
+    helper_classes: set[str] | None = None,
+) -> str | None:
+    """Add codeflash_capture decorator to __init__ function in the specified class.
+
+    helper_classes from the same module are decorated in the same pass with is_fto=False, saving a parse and unparse.
+    Returns None when no decorator had to be added, so the code is left as it is.
+    """
     tree = ast.parse(code)
     transformer = InitDecorator(target_classes, fto_name, tmp_dir_path, tests_root, is_fto)
     modified_tree = transformer.visit(tree)
-    if transformer.inserted_decorator:
-        ast.fix_missing_locations(modified_tree)
+    inserted_decorator = transformer.inserted_decorator
+    if helper_classes:
+        helper_transformer = InitDecorator(helper_classes, fto_name, tmp_dir_path, tests_root, is_fto=False)
+        modified_tree = helper_transformer.visit(modified_tree)
+        inserted_decorator = inserted_decorator or helper_transformer.inserted_decorator
+    if not inserted_decorator:
+        return None
+    ast.fix_missing_locations(modified_tree)
 
     # Convert back to source code
     return isort.code(code=ast.unparse(modified_tree), float_to_top=True)
@@ -78,6 +99,22 @@ class InitDecorator(ast.NodeTransformer):
         self.has_import = False
         self.tests_root = tests_root
         self.inserted_decorator = False
+        # only the function_name keyword depends on the class, the others are shared by every decorator this inserts
+        self.decorator_keywords = [
+            ast.keyword(arg="tmp_dir_path", value=ast.Constant(value=self.tmp_dir_path)),
+            ast.keyword(arg="tests_root", value=ast.Constant(value=str(self.tests_root))),
+            ast.keyword(arg="is_fto", value=ast.Constant(value=self.is_fto)),
+        ]
+
+    def make_decorator(self, class_name: str) -> ast.Call:
+        return ast.Call(
+            func=ast.Name(id="codeflash_capture", ctx=ast.Load()),
+            args=[],
+            keywords=[
+                ast.keyword(arg="function_name", value=ast.Constant(value=".".join([class_name, "__init__"]))),
+                *self.decorator_keywords,
+            ],
+        )
 
     def visit_ImportFrom(self, node: ast.ImportFrom) -> ast.ImportFrom:
         # Check if our import already exists
@@ -104,18 +141,6 @@ class InitDecorator(ast.NodeTransformer):
         # Look for __init__ method
         has_init = False
 
-        # Create the decorator
-        decorator = ast.Call(
-            func=ast.Name(id="codeflash_capture", ctx=ast.Load()),
-            args=[],
-            keywords=[
-                ast.keyword(arg="function_name", value=ast.Constant(value=".".join([node.name, "__init__"]))),
-                ast.keyword(arg="tmp_dir_path", value=ast.Constant(value=self.tmp_dir_path)),
-                ast.keyword(arg="tests_root", value=ast.Constant(value=str(self.tests_root))),
-                ast.keyword(arg="is_fto", value=ast.Constant(value=self.is_fto)),
-            ],
-        )
-
         for item in node.body:
             if (
                 isinstance(item, ast.FunctionDef)
@@ -131,7 +156,7 @@ class InitDecorator(ast.NodeTransformer):
                     isinstance(d, ast.Call) and isinstance(d.func, ast.Name) and d.func.id == "codeflash_capture"
                     for d in item.decorator_list
                 ):
-                    item.decorator_list.insert(0, decorator)
+                    item.decorator_list.insert(0, self.make_decorator(node.name))
                     self.inserted_decorator = True
 
         if not has_init:
@@ -160,7 +185,11 @@ class InitDecorator(ast.NodeTransformer):
 
             # Create the complete function
             init_func = ast.FunctionDef(
-                name="__init__", args=arguments, body=[super_call], decorator_list=[decorator], returns=None
+                name="__init__",
+                args=arguments,
+                body=[super_call],
+                decorator_list=[self.make_decorator(node.name)],
+                returns=None,
             )
 
             node.body.insert(0, init_func)
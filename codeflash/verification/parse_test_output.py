@@ -259,10 +259,14 @@ def parse_test_xml(
                         timed_out = True
 
             sys_stdout = testcase.system_out or ""
-            matches = matches_re.findall(sys_stdout)
+            # plain substring checks are much cheaper than letting the regexes scan output that has nothing to match
+            has_markers = "!######" in sys_stdout
+            matches = matches_re.findall(sys_stdout) if has_markers else []
 
             if sys_stdout:
-                sys_stdout = cleaner_re.sub("", sys_stdout).strip()
+                if has_markers or "Captured" in sys_stdout:
+                    sys_stdout = cleaner_re.sub("", sys_stdout)
+                sys_stdout = sys_stdout.strip()
 
             if not matches or not len(matches):
                 test_results.add(
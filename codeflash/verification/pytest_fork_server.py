@@ -0,0 +1,179 @@
+"""Run pytest sessions by forking them from a process that has already imported pytest.
+
+The server is started once with `python pytest_fork_server.py`, it only imports pytest and then forks a child per
+request, so every run still gets fresh user and test modules (the code under test changes on disk between runs) while
+the interpreter and pytest startup is only paid once. Requests and replies are JSON lines over the server's stdin and
+stdout, the child's output goes to files named in the request.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any
+
+FORK_SERVER_POLL_INTERVAL = 0.005
+
+
+def run_forked_pytest(request: dict[str, Any], base_sys_path: list[str]) -> dict[str, Any]:
+    """Fork a child that runs pytest.main for the request, as if started with `python -m pytest` in request["cwd"]."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+            os.dup2(os.open(request["stdout_path"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 1)
+            os.dup2(os.open(request["stderr_path"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 2)
+            env = request["env"]
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(env)
+            # what the interpreter would have derived from the environment at startup
+            python_path = [entry for entry in env.get("PYTHONPATH", "").split(os.pathsep) if entry]
+            sys.path[:] = [str(Path.cwd()), *python_path, *base_sys_path]
+            sys.dont_write_bytecode = bool(env.get("PYTHONDONTWRITEBYTECODE"))
+            sys.argv = [sys.argv[0]]
+
+            import pytest
+
+            if request["coverage_config_file"] is None:
+                exit_code = int(pytest.main(request["args"]))
+            else:
+                # like `coverage run -m pytest`, the data is saved to the data_file of the run's rcfile
+                from coverage import Coverage
+
+                cov = Coverage(config_file=request["coverage_config_file"])
+                cov.start()
+                try:
+                    exit_code = int(pytest.main(request["args"]))
+                finally:
+                    cov.stop()
+                    cov.save()
+        except BaseException:  # noqa: BLE001
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+
+    deadline = time.monotonic() + request["timeout"]
+    while True:
+        waited_pid, status = os.waitpid(pid, os.WNOHANG)
+        if waited_pid:
+            return {"returncode": os.waitstatus_to_exitcode(status), "timed_out": False}
+        if time.monotonic() > deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return {"returncode": -signal.SIGKILL, "timed_out": True}
+        time.sleep(FORK_SERVER_POLL_INTERVAL)
+
+
+def serve() -> None:
+    # drop this script's directory and the server's own PYTHONPATH, each request brings its own
+    server_python_path = set(os.environ.get("PYTHONPATH", "").split(os.pathsep))
+    base_sys_path = [entry for entry in sys.path[1:] if entry not in server_python_path]
+
+    import pytest  # noqa: F401
+
+    with contextlib.suppress(ImportError):
+        import coverage  # noqa: F401
+
+    for line in sys.stdin:
+        reply = run_forked_pytest(json.loads(line), base_sys_path)
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+class PytestForkServer:
+    """Client side of the fork server, started lazily on the first run and stopped at exit."""
+
+    def __init__(self, python_executable: str, output_dir: Path) -> None:
+        self.python_executable = python_executable
+        self.output_dir = output_dir
+        self.process: subprocess.Popen | None = None
+        self.lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def start(self) -> subprocess.Popen:
+        if self.process is None or self.process.poll() is not None:
+            self.process = subprocess.Popen(
+                [self.python_executable, __file__],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                cwd=Path(__file__).parent,
+            )
+        return self.process
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def run(
+        self,
+        args: list[str],
+        cwd: Path,
+        env: dict[str, str],
+        timeout: int,
+        *,
+        coverage_config_file: Path | None = None,
+    ) -> subprocess.CompletedProcess:
+        """Run `pytest <args>` like execute_test_subprocess would, raises OSError if the server is unusable.
+
+        With a coverage_config_file the run is measured like `coverage run --rcfile=<file> -m pytest <args>`.
+        """
+        stdout_path = self.output_dir / "pytest_fork_server_stdout.txt"
+        stderr_path = self.output_dir / "pytest_fork_server_stderr.txt"
+        request = {
+            "args": args,
+            "cwd": str(cwd),
+            "env": env,
+            "timeout": timeout,
+            "stdout_path": str(stdout_path),
+            "stderr_path": str(stderr_path),
+            "coverage_config_file": None if coverage_config_file is None else str(coverage_config_file),
+        }
+        with self.lock:
+            process = self.start()
+            try:
+                process.stdin.write(json.dumps(request) + "\n")
+                process.stdin.flush()
+                reply_line = process.stdout.readline()
+            except (OSError, ValueError) as e:
+                self.stop()
+                msg = "pytest fork server is not reachable"
+                raise OSError(msg) from e
+            if not reply_line:
+                self.stop()
+                msg = "pytest fork server exited"
+                raise OSError(msg)
+            reply = json.loads(reply_line)
+            cmd = [self.python_executable, "-m", "pytest", *args]
+            if reply["timed_out"]:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            return subprocess.CompletedProcess(
+                cmd,
+                reply["returncode"],
+                stdout=stdout_path.read_text(errors="replace"),
+                stderr=stderr_path.read_text(errors="replace"),
+            )
+
+
+if __name__ == "__main__":
+    serve()
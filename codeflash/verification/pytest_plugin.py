@@ -112,6 +112,11 @@ class PytestLoops:
     @hookspec(firstresult=True)
     def pytest_runtestloop(self, session: Session) -> bool:
         """Reimplement the test loop but loop for the user defined amount of time."""
+        if session.config.pluginmanager.has_plugin("dsession") or hasattr(session.config, "workerinput"):
+            # pytest-xdist (controller or worker) schedules the tests itself. It is only used for the single loop
+            # behavioral runs, so leave the test loop to it.
+            os.environ["CODEFLASH_LOOP_INDEX"] = "1"
+            return None
         if session.testsfailed and not session.config.option.continue_on_collection_errors:
             msg = "{} error{} during collection".format(session.testsfailed, "s" if session.testsfailed != 1 else "")
             raise session.Interrupted(msg)
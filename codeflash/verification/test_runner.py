@@ -1,32 +1,71 @@
 from __future__ import annotations
 
+import importlib.util
+import logging
+import os
 import shlex
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from coverage import Coverage
+
 from codeflash.cli_cmds.console import logger
 from codeflash.code_utils.code_utils import get_run_tmp_file
 from codeflash.code_utils.compat import IS_POSIX, SAFE_SYS_EXECUTABLE
 from codeflash.code_utils.config_consts import TOTAL_LOOPING_TIME
 from codeflash.code_utils.coverage_utils import prepare_coverage_files
 from codeflash.models.models import TestFiles, TestType
+from codeflash.verification.pytest_fork_server import PytestForkServer
 
 if TYPE_CHECKING:
     from codeflash.models.models import TestFiles
 
 BEHAVIORAL_BLOCKLISTED_PLUGINS = ["benchmark"]
 BENCHMARKING_BLOCKLISTED_PLUGINS = ["codspeed", "cov", "benchmark", "profiling"]
+BEHAVIORAL_BLOCKLIST_ARGS = [f"-p no:{plugin}" for plugin in BEHAVIORAL_BLOCKLISTED_PLUGINS]
+BEHAVIORAL_COVERAGE_BLOCKLIST_ARGS = [f"-p no:{plugin}" for plugin in BEHAVIORAL_BLOCKLISTED_PLUGINS if plugin != "cov"]
+BENCHMARKING_BLOCKLIST_ARGS = [f"-p no:{plugin}" for plugin in BENCHMARKING_BLOCKLISTED_PLUGINS]
+HAS_XDIST = importlib.util.find_spec("xdist") is not None
+HAS_FORK = hasattr(os, "fork")
+# the instrumented test files are throwaway, don't write bytecode for them
+PYTEST_ENV_OVERRIDES = {"PYTEST_PLUGINS": "codeflash.verification.pytest_plugin", "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+@lru_cache(maxsize=32)
+def split_command(cmd: str, *, posix: bool = True) -> tuple[str, ...]:
+    """Memoized shlex.split, the same few pytest commands are split again for every test run."""
+    return tuple(shlex.split(cmd, posix=posix))
+
+
+@lru_cache(maxsize=1)
+def get_pytest_fork_server() -> PytestForkServer:
+    return PytestForkServer(SAFE_SYS_EXECUTABLE, get_run_tmp_file(Path("pytest_fork_server")).parent)
+
+
+def pytest_cache_dir_args() -> list[str]:
+    """Point pytest's cache at the run's temporary directory, the cache fixture stays available to the user's tests."""
+    return ["-o", f"cache_dir={get_run_tmp_file(Path('pytest_cache')).as_posix()}"]
 
 
 def execute_test_subprocess(
     cmd_list: list[str], cwd: Path, env: dict[str, str] | None, timeout: int = 600
 ) -> subprocess.CompletedProcess:
     """Execute a subprocess with the given command list, working directory, environment variables, and timeout."""
-    logger.debug(f"executing test run with command: {' '.join(cmd_list)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"executing test run with command: {' '.join(cmd_list)}")
+    # Keep this free of preexec_fn, user/group changes and start_new_session, those force CPython off the vfork launch
     return subprocess.run(cmd_list, capture_output=True, cwd=cwd, env=env, text=True, timeout=timeout, check=False)
 
 
+def skip_empty_test_run(result_file_path: Path) -> subprocess.CompletedProcess:
+    """Stand in for a pytest run without any test files, removing the results of an earlier run so none get parsed."""
+    logger.debug("No test files to run, skipping the pytest run")
+    result_file_path.unlink(missing_ok=True)
+    return subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr="")
+
+
 def run_behavioral_tests(
     test_paths: TestFiles,
     test_framework: str,
@@ -38,28 +77,26 @@ def run_behavioral_tests(
     verbose: bool = False,
     pytest_target_runtime_seconds: int = TOTAL_LOOPING_TIME,
     enable_coverage: bool = False,
+    parallel: bool = False,
+    fork_server: bool = False,
 ) -> tuple[Path, subprocess.CompletedProcess, Path | None, Path | None]:
     if test_framework == "pytest":
         test_files: list[str] = []
         for file in test_paths.test_files:
+            file_path = os.fspath(file.instrumented_behavior_file_path)
             if file.test_type == TestType.REPLAY_TEST:
                 # TODO: Does this work for unittest framework?
-                test_files.extend(
-                    [
-                        str(file.instrumented_behavior_file_path) + "::" + test.test_function
-                        for test in file.tests_in_file
-                    ]
-                )
+                test_files.extend([f"{file_path}::{test.test_function}" for test in file.tests_in_file])
             else:
-                test_files.append(str(file.instrumented_behavior_file_path))
+                test_files.append(file_path)
         pytest_cmd_list = (
-            shlex.split(f"{SAFE_SYS_EXECUTABLE} -m pytest", posix=IS_POSIX)
+            list(split_command(f"{SAFE_SYS_EXECUTABLE} -m pytest", posix=IS_POSIX))
             if pytest_cmd == "pytest"
-            else [SAFE_SYS_EXECUTABLE, "-m", *shlex.split(pytest_cmd, posix=IS_POSIX)]
+            else [SAFE_SYS_EXECUTABLE, "-m", *split_command(pytest_cmd, posix=IS_POSIX)]
         )
         test_files = list(set(test_files))  # remove multiple calls in the same test function
         common_pytest_args = [
-            "--capture=tee-sys",
+            "--capture=fd",
             f"--timeout={pytest_timeout}",
             "-q",
             "--codeflash_loops_scope=session",
@@ -67,21 +104,34 @@ def run_behavioral_tests(
             "--codeflash_max_loops=1",
             f"--codeflash_seconds={pytest_target_runtime_seconds}",  # TODO : This is unnecessary, update the plugin to not ask for this  # noqa: E501
         ]
+        # Benchmarking always stays serial for timing fidelity. Coverage would need its per-worker data combined.
+        if parallel and HAS_XDIST and not enable_coverage:
+            num_workers = min(os.cpu_count() or 1, len({test_file.split("::", 1)[0] for test_file in test_files}))
+            if num_workers > 1:
+                # loadfile keeps all the tests of a module, including the selected replay test functions, on one worker
+                common_pytest_args.extend(["-n", str(num_workers), "--dist=loadfile"])
 
         result_file_path = get_run_tmp_file(Path("pytest_results.xml"))
-        result_args = [f"--junitxml={result_file_path.as_posix()}", "-o", "junit_logging=all"]
+        if not test_files:
+            return result_file_path, skip_empty_test_run(result_file_path), None, None
+        result_args = [
+            f"--junitxml={result_file_path.as_posix()}",
+            "-o",
+            "junit_logging=all",
+            *pytest_cache_dir_args(),
+        ]
 
-        pytest_test_env = test_env.copy()
-        pytest_test_env["PYTEST_PLUGINS"] = "codeflash.verification.pytest_plugin"
+        pytest_test_env = {**test_env, **PYTEST_ENV_OVERRIDES}
+        use_fork_server = fork_server and HAS_FORK and pytest_cmd == "pytest"
 
         if enable_coverage:
             coverage_database_file, coverage_config_file = prepare_coverage_files()
 
-            cov_erase = execute_test_subprocess(
-                shlex.split(f"{SAFE_SYS_EXECUTABLE} -m coverage erase"), cwd=cwd, env=pytest_test_env
-            )  # this cleanup is necessary to avoid coverage data from previous runs, if there are any,
-            # then the current run will be appended to the previous data, which skews the results
-            logger.debug(cov_erase)
+            # this cleanup is necessary to avoid coverage data from previous runs, if there are any,
+            # then the current run will be appended to the previous data, which skews the results.
+            # Done in-process, only the instrumented test run itself needs its own process.
+            Coverage(config_file=coverage_config_file.as_posix()).erase()
+            logger.debug(f"Erased previous coverage data in {coverage_database_file}")
             coverage_cmd = [
                 SAFE_SYS_EXECUTABLE,
                 "-m",
@@ -94,27 +144,44 @@ def run_behavioral_tests(
             if pytest_cmd == "pytest":
                 coverage_cmd.extend(["pytest"])
             else:
-                coverage_cmd.extend(shlex.split(pytest_cmd, posix=IS_POSIX)[1:])
+                coverage_cmd.extend(split_command(pytest_cmd, posix=IS_POSIX)[1:])
 
-            blocklist_args = [f"-p no:{plugin}" for plugin in BEHAVIORAL_BLOCKLISTED_PLUGINS if plugin != "cov"]
-            results = execute_test_subprocess(
-                coverage_cmd + common_pytest_args + blocklist_args + result_args + test_files,
-                cwd=cwd,
-                env=pytest_test_env,
-                timeout=600,
-            )
+            pytest_args = common_pytest_args + BEHAVIORAL_COVERAGE_BLOCKLIST_ARGS + result_args + test_files
+            results = None
+            if use_fork_server:
+                try:
+                    results = get_pytest_fork_server().run(
+                        pytest_args,
+                        cwd=cwd,
+                        env=pytest_test_env,
+                        timeout=600,
+                        coverage_config_file=coverage_config_file,
+                    )
+                except OSError:
+                    logger.debug("pytest fork server failed, running the tests in a new process", exc_info=True)
+            if results is None:
+                results = execute_test_subprocess(coverage_cmd + pytest_args, cwd=cwd, env=pytest_test_env, timeout=600)
             logger.debug(
                 f"Result return code: {results.returncode}, "
                 f"{'Result stderr:' + str(results.stderr) if results.stderr else ''}"
             )
         else:
-            blocklist_args = [f"-p no:{plugin}" for plugin in BEHAVIORAL_BLOCKLISTED_PLUGINS]
-            results = execute_test_subprocess(
-                pytest_cmd_list + common_pytest_args + blocklist_args + result_args + test_files,
-                cwd=cwd,
-                env=pytest_test_env,
-                timeout=600,  # TODO: Make this dynamic
-            )
+            # only pass/fail and the timeout messages are parsed, skip the assertion rewriting import hook
+            plain_assert_args = ["--assert=plain"]
+            pytest_args = common_pytest_args + plain_assert_args + BEHAVIORAL_BLOCKLIST_ARGS + result_args + test_files
+            results = None
+            if use_fork_server:
+                try:
+                    results = get_pytest_fork_server().run(pytest_args, cwd=cwd, env=pytest_test_env, timeout=600)
+                except OSError:
+                    logger.debug("pytest fork server failed, running the tests in a new process", exc_info=True)
+            if results is None:
+                results = execute_test_subprocess(
+                    pytest_cmd_list + pytest_args,
+                    cwd=cwd,
+                    env=pytest_test_env,
+                    timeout=600,  # TODO: Make this dynamic
+                )
             logger.debug(
                 f"""Result return code: {results.returncode}, {"Result stderr:" + str(results.stderr) if results.stderr else ""}"""
             )
@@ -158,27 +225,27 @@ def run_line_profile_tests(
 ) -> tuple[Path, subprocess.CompletedProcess]:
     if test_framework == "pytest":
         pytest_cmd_list = (
-            shlex.split(f"{SAFE_SYS_EXECUTABLE} -m pytest", posix=IS_POSIX)
+            list(split_command(f"{SAFE_SYS_EXECUTABLE} -m pytest", posix=IS_POSIX))
             if pytest_cmd == "pytest"
-            else shlex.split(pytest_cmd)
+            else list(split_command(pytest_cmd))
         )
         test_files: list[str] = []
         for file in test_paths.test_files:
+            file_path = os.fspath(file.benchmarking_file_path)
             if file.test_type in {TestType.REPLAY_TEST, TestType.EXISTING_UNIT_TEST} and file.tests_in_file:
+                # parametrized ids are dropped, the test function is selected with all its parameters
                 test_files.extend(
                     [
-                        str(file.benchmarking_file_path)
-                        + "::"
-                        + (test.test_class + "::" if test.test_class else "")
-                        + (test.test_function.split("[", 1)[0] if "[" in test.test_function else test.test_function)
+                        f"{file_path}::{test.test_class + '::' if test.test_class else ''}"
+                        f"{test.test_function.split('[', 1)[0]}"
                         for test in file.tests_in_file
                     ]
                 )
             else:
-                test_files.append(str(file.benchmarking_file_path))
+                test_files.append(file_path)
         test_files = list(set(test_files))  # remove multiple calls in the same test function
         pytest_args = [
-            "--capture=tee-sys",
+            "--capture=fd",
             f"--timeout={pytest_timeout}",
             "-q",
             "--codeflash_loops_scope=session",
@@ -187,13 +254,17 @@ def run_line_profile_tests(
             f"--codeflash_seconds={pytest_target_runtime_seconds}",
         ]
         result_file_path = get_run_tmp_file(Path("pytest_results.xml"))
-        result_args = [f"--junitxml={result_file_path.as_posix()}", "-o", "junit_logging=all"]
-        pytest_test_env = test_env.copy()
-        pytest_test_env["PYTEST_PLUGINS"] = "codeflash.verification.pytest_plugin"
-        blocklist_args = [f"-p no:{plugin}" for plugin in BENCHMARKING_BLOCKLISTED_PLUGINS]
-        pytest_test_env["LINE_PROFILE"]="1"
+        if not test_files:
+            return line_profiler_output_file, skip_empty_test_run(result_file_path)
+        result_args = [
+            f"--junitxml={result_file_path.as_posix()}",
+            "-o",
+            "junit_logging=all",
+            *pytest_cache_dir_args(),
+        ]
+        pytest_test_env = {**test_env, **PYTEST_ENV_OVERRIDES, "LINE_PROFILE": "1"}
         results = execute_test_subprocess(
-            pytest_cmd_list + pytest_args + blocklist_args + result_args + test_files,
+            pytest_cmd_list + pytest_args + BENCHMARKING_BLOCKLIST_ARGS + result_args + test_files,
             cwd=cwd,
             env=pytest_test_env,
             timeout=600,  # TODO: Make this dynamic
@@ -218,42 +289,48 @@ def run_benchmarking_tests(
 ) -> tuple[Path, subprocess.CompletedProcess]:
     if test_framework == "pytest":
         pytest_cmd_list = (
-            shlex.split(f"{SAFE_SYS_EXECUTABLE} -m pytest", posix=IS_POSIX)
+            list(split_command(f"{SAFE_SYS_EXECUTABLE} -m pytest", posix=IS_POSIX))
             if pytest_cmd == "pytest"
-            else shlex.split(pytest_cmd)
+            else list(split_command(pytest_cmd))
         )
         test_files: list[str] = []
         for file in test_paths.test_files:
+            file_path = os.fspath(file.benchmarking_file_path)
             if file.test_type in {TestType.REPLAY_TEST, TestType.EXISTING_UNIT_TEST} and file.tests_in_file:
+                # parametrized ids are dropped, the test function is selected with all its parameters
                 test_files.extend(
                     [
-                        str(file.benchmarking_file_path)
-                        + "::"
-                        + (test.test_class + "::" if test.test_class else "")
-                        + (test.test_function.split("[", 1)[0] if "[" in test.test_function else test.test_function)
+                        f"{file_path}::{test.test_class + '::' if test.test_class else ''}"
+                        f"{test.test_function.split('[', 1)[0]}"
                         for test in file.tests_in_file
                     ]
                 )
             else:
-                test_files.append(str(file.benchmarking_file_path))
+                test_files.append(file_path)
         test_files = list(set(test_files))  # remove multiple calls in the same test function
         pytest_args = [
-            "--capture=tee-sys",
+            "--capture=fd",
             f"--timeout={pytest_timeout}",
             "-q",
+            "--assert=plain",
             "--codeflash_loops_scope=session",
             f"--codeflash_min_loops={pytest_min_loops}",
             f"--codeflash_max_loops={pytest_max_loops}",
             f"--codeflash_seconds={pytest_target_runtime_seconds}",
         ]
         result_file_path = get_run_tmp_file(Path("pytest_results.xml"))
-        result_args = [f"--junitxml={result_file_path.as_posix()}", "-o", "junit_logging=all"]
-        pytest_test_env = test_env.copy()
-        pytest_test_env["PYTEST_PLUGINS"] = "codeflash.verification.pytest_plugin"
-        blocklist_args = [f"-p no:{plugin}" for plugin in BENCHMARKING_BLOCKLISTED_PLUGINS]
+        if not test_files:
+            return result_file_path, skip_empty_test_run(result_file_path)
+        result_args = [
+            f"--junitxml={result_file_path.as_posix()}",
+            "-o",
+            "junit_logging=all",
+            *pytest_cache_dir_args(),
+        ]
+        pytest_test_env = {**test_env, **PYTEST_ENV_OVERRIDES}
 
         results = execute_test_subprocess(
-            pytest_cmd_list + pytest_args + blocklist_args + result_args + test_files,
+            pytest_cmd_list + pytest_args + BENCHMARKING_BLOCKLIST_ARGS + result_args + test_files,
             cwd=cwd,
             env=pytest_test_env,
             timeout=600,  # TODO: Make this dynamic
@@ -277,8 +354,11 @@ def run_unittest_tests(
     log_level = ["-v"] if verbose else []
     files = [str(file) for file in test_file_paths]
     output_file = ["--output-file", str(result_file_path)]
+    # the instrumented test files are throwaway, don't write bytecode for them
+    unittest_test_env = {**test_env, "PYTHONDONTWRITEBYTECODE": "1"}
 
+    # Stays out of process: candidate code is swapped on disk between runs, in-process imports would keep stale modules
     results = execute_test_subprocess(
-        unittest_cmd_list + log_level + files + output_file, cwd=cwd, env=test_env, timeout=600
+        unittest_cmd_list + log_level + files + output_file, cwd=cwd, env=unittest_test_env, timeout=600
     )
     return result_file_path, results
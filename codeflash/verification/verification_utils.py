@@ -75,3 +75,7 @@ class TestConfig:
     # or for unittest - project_root_from_module_root(args.tests_root, pyproject_file_path)
     concolic_test_root_dir: Optional[Path] = None
     pytest_cmd: str = "pytest"
+    # run the behavioral tests of different files in parallel with pytest-xdist, when it is installed
+    parallel_behavioral_tests: bool = False
+    # fork the behavioral pytest runs from a process that already imported pytest, POSIX only
+    pytest_fork_server: bool = False
@@ -7,8 +7,10 @@ from pathlib import Path
 
 from codeflash.code_utils.code_extractor import delete___future___aliased_imports, find_preexisting_objects
 from codeflash.code_utils.code_replacer import (
+    can_change_module,
     is_zero_diff,
     replace_functions_and_add_imports,
+    replace_functions_and_add_imports_cached,
     replace_functions_in_file,
 )
 from codeflash.discovery.functions_to_optimize import FunctionToOptimize
@@ -18,6 +20,9 @@ from codeflash.verification.verification_utils import TestConfig
 
 os.environ["CODEFLASH_API_KEY"] = "cf-test-key"
 
+TEST_FILE_PATH = Path(__file__).resolve()
+TEST_DIR_PATH = TEST_FILE_PATH.parent
+
 
 @dataclasses.dataclass
 class JediDefinition:
@@ -34,6 +39,23 @@ class FakeFunctionSource:
     jedi_definition: JediDefinition
 
 
+def replace_in_test_module(
+    original_code: str,
+    optim_code: str,
+    function_names: list[str],
+    preexisting_objects: set[tuple[str, tuple[FunctionParent, ...]]],
+) -> str:
+    """Replace the functions as if the code lived in this test module."""
+    return replace_functions_and_add_imports(
+        source_code=original_code,
+        function_names=function_names,
+        optimized_code=optim_code,
+        module_abspath=TEST_FILE_PATH,
+        preexisting_objects=preexisting_objects,
+        project_root_path=TEST_DIR_PATH,
+    )
+
+
 def test_test_libcst_code_replacement() -> None:
     optim_code = """import libcst as cst
 from typing import Optional
@@ -75,14 +97,7 @@ print("Hello world")
 
     function_name: str = "NewClass.new_function"
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=[function_name],
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, [function_name], preexisting_objects)
     assert new_code == expected
 
 
@@ -136,14 +151,7 @@ print("Hello world")
 
     function_name: str = "NewClass.new_function"
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=[function_name],
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, [function_name], preexisting_objects)
     assert new_code == expected
 
 
@@ -197,14 +205,7 @@ print("Salut monde")
 
     function_names: list[str] = ["other_function"]
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == expected
 
 
@@ -261,14 +262,7 @@ print("Salut monde")
 
     function_names: list[str] = ["yet_another_function", "other_function"]
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == expected
 
 
@@ -314,14 +308,7 @@ def supersort(doink):
 
     function_names: list[str] = ["sorter_deps"]
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == expected
 
 
@@ -389,24 +376,10 @@ def blab(st):
 print("Not cool")
 """
     preexisting_objects = find_preexisting_objects(original_code_main) | find_preexisting_objects(original_code_helper)
-    new_main_code: str = replace_functions_and_add_imports(
-        source_code=original_code_main,
-        function_names=["other_function"],
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_main_code: str = replace_in_test_module(original_code_main, optim_code, ["other_function"], preexisting_objects)
     assert new_main_code == expected_main
 
-    new_helper_code: str = replace_functions_and_add_imports(
-        source_code=original_code_helper,
-        function_names=["blob"],
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_helper_code: str = replace_in_test_module(original_code_helper, optim_code, ["blob"], preexisting_objects)
     assert new_helper_code == expected_helper
 
 
@@ -593,14 +566,7 @@ class CacheConfig(BaseConfig):
     function_names: list[str] = ["CacheSimilarityEvalConfig.from_config"]
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
 
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == expected
 
 
@@ -663,14 +629,7 @@ def test_test_libcst_code_replacement8() -> None:
 '''
     function_names: list[str] = ["_EmbeddingDistanceChainMixin._hamming_distance"]
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == expected
 
 
@@ -716,14 +675,7 @@ print("Hello world")
 """
     function_name: str = "NewClass.__init__"
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=[function_name],
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, [function_name], preexisting_objects)
     assert new_code == expected
 
 
@@ -768,7 +720,7 @@ class MainClass:
     def main_method(self):
         return HelperClass(self.name).helper_method()
 """
-    file_path = Path(__file__).resolve()
+    file_path = TEST_FILE_PATH
     func_top_optimize = FunctionToOptimize(
         function_name="main_method", file_path=file_path, parents=[FunctionParent("MainClass", "ClassDef")]
     )
@@ -784,8 +736,8 @@ class MainClass:
     assert code_context.testgen_context_code == get_code_output
 
 
-def test_code_replacement11() -> None:
-    optim_code = '''class Fu():
+# shared by the Fu tests, identical strings also share their parse in the replacer
+FU_OPTIMIZED_CODE = '''class Fu():
     def foo(self) -> dict[str, str]:
         payload: dict[str, str] = {"bar": self.bar(), "real_bar": str(self.real_bar() + 1)}
         return payload
@@ -794,7 +746,7 @@ def test_code_replacement11() -> None:
         """No abstract nonsense"""
         pass
 '''
-    original_code = '''class Fu():
+FU_ORIGINAL_CODE = '''class Fu():
     def foo(self) -> dict[str, str]:
         payload: dict[str, str] = {"bar": self.bar(), "real_bar": str(self.real_bar())}
         return payload
@@ -803,6 +755,11 @@ def test_code_replacement11() -> None:
         """No abstract nonsense"""
         return 0
 '''
+
+
+def test_code_replacement11() -> None:
+    optim_code = FU_OPTIMIZED_CODE
+    original_code = FU_ORIGINAL_CODE
     expected_code = '''class Fu():
     def foo(self) -> dict[str, str]:
         payload: dict[str, str] = {"bar": self.bar(), "real_bar": str(self.real_bar() + 1)}
@@ -826,24 +783,8 @@ def test_code_replacement11() -> None:
 
 
 def test_code_replacement12() -> None:
-    optim_code = '''class Fu():
-    def foo(self) -> dict[str, str]:
-        payload: dict[str, str] = {"bar": self.bar(), "real_bar": str(self.real_bar() + 1)}
-        return payload
-
-    def real_bar(self) -> int:
-        """No abstract nonsense"""
-        pass
-'''
-    original_code = '''class Fu():
-    def foo(self) -> dict[str, str]:
-        payload: dict[str, str] = {"bar": self.bar(), "real_bar": str(self.real_bar())}
-        return payload
-
-    def real_bar(self) -> int:
-        """No abstract nonsense"""
-        return 0
-'''
+    optim_code = FU_OPTIMIZED_CODE
+    original_code = FU_ORIGINAL_CODE
     expected_code = '''class Fu():
     def foo(self) -> dict[str, str]:
         payload: dict[str, str] = {"bar": self.bar(), "real_bar": str(self.real_bar())}
@@ -892,14 +833,7 @@ def test_test_libcst_code_replacement13() -> None:
 
     function_names: list[str] = ["yet_another_function", "other_function"]
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = []
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == original_code
 
 
@@ -1078,13 +1012,8 @@ class TestResults(BaseModel):
         )
     ]
 
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=["TestResults.get_test_pass_fail_report_by_type"],
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).parent.resolve(),
+    new_code: str = replace_in_test_module(
+        original_code, optim_code, ["TestResults.get_test_pass_fail_report_by_type"], preexisting_objects
     )
 
     helper_functions_by_module_abspath = defaultdict(set)
@@ -1098,7 +1027,7 @@ class TestResults(BaseModel):
             optimized_code=optim_code,
             module_abspath=module_abspath,
             preexisting_objects=preexisting_objects,
-            project_root_path=Path(__file__).parent.resolve(),
+            project_root_path=TEST_DIR_PATH,
         )
 
     assert (
@@ -1282,7 +1211,7 @@ def cosine_similarity_top_k(
 
     helper_functions = [
         FakeFunctionSource(
-            file_path=(Path(__file__).parent / "code_to_optimize" / "math_utils.py").resolve(),
+            file_path=(TEST_DIR_PATH / "code_to_optimize" / "math_utils.py").resolve(),
             qualified_name="Matrix",
             fully_qualified_name="code_to_optimize.math_utils.Matrix",
             only_function_name="Matrix",
@@ -1290,7 +1219,7 @@ def cosine_similarity_top_k(
             jedi_definition=JediDefinition(type="class"),
         ),
         FakeFunctionSource(
-            file_path=(Path(__file__).parent / "code_to_optimize" / "math_utils.py").resolve(),
+            file_path=(TEST_DIR_PATH / "code_to_optimize" / "math_utils.py").resolve(),
             qualified_name="cosine_similarity",
             fully_qualified_name="code_to_optimize.math_utils.cosine_similarity",
             only_function_name="cosine_similarity",
@@ -1303,9 +1232,9 @@ def cosine_similarity_top_k(
         source_code=original_code,
         function_names=["cosine_similarity_top_k"],
         optimized_code=optim_code,
-        module_abspath=(Path(__file__).parent / "code_to_optimize").resolve(),
+        module_abspath=(TEST_DIR_PATH / "code_to_optimize").resolve(),
         preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).parent.parent.resolve(),
+        project_root_path=TEST_DIR_PATH.parent,
     )
     assert (
             new_code
@@ -1363,7 +1292,7 @@ def cosine_similarity_top_k(
             optimized_code=optim_code,
             module_abspath=module_abspath,
             preexisting_objects=preexisting_objects,
-            project_root_path=Path(__file__).parent.parent.resolve(),
+            project_root_path=TEST_DIR_PATH.parent,
         )
 
     assert (
@@ -1580,14 +1509,7 @@ print("Hello world")
         "NestedClass.nested_function",
     ]  # Nested classes should be ignored, even if provided as target
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == expected
 
 
@@ -1616,12 +1538,84 @@ print("Hello world")
 
     function_names: list[str] = ["NewClass.__init__", "NewClass.__call__", "NewClass.new_function2"]
     preexisting_objects: set[tuple[str, tuple[FunctionParent,...]]] = find_preexisting_objects(original_code)
-    new_code: str = replace_functions_and_add_imports(
-        source_code=original_code,
-        function_names=function_names,
-        optimized_code=optim_code,
-        module_abspath=Path(__file__).resolve(),
-        preexisting_objects=preexisting_objects,
-        project_root_path=Path(__file__).resolve().parent.resolve(),
-    )
+    new_code: str = replace_in_test_module(original_code, optim_code, function_names, preexisting_objects)
     assert new_code == original_code
+
+
+def test_can_change_module() -> None:
+    original_code = """import numpy as np
+
+class Sorter:
+    def __init__(self, arr):
+        self.arr = arr
+
+    def sort(self):
+        return sorted(self.arr)
+
+def helper(x):
+    return np.array(x)
+"""
+    preexisting_objects = find_preexisting_objects(original_code)
+
+    # the candidate left this module's functions untouched, only changing code that lives in another module
+    unchanged_helper = """import numpy as np
+
+def other_module_function(x):
+    return x * 2
+
+def helper(x):
+    return np.array(x)
+"""
+    assert not can_change_module(original_code, unchanged_helper, set())
+    preexisting_objects_with_other = {*preexisting_objects, ("other_module_function", ())}
+    assert not can_change_module(original_code, unchanged_helper, preexisting_objects_with_other)
+    # other_module_function would be added to this module as a new function
+    assert can_change_module(original_code, unchanged_helper, preexisting_objects)
+
+    changed_method = """class Sorter:
+    def sort(self):
+        self.arr.sort()
+        return self.arr
+"""
+    assert can_change_module(original_code, changed_method, preexisting_objects)
+
+    changed_init = """class Sorter:
+    def __init__(self, arr):
+        self.arr = list(arr)
+"""
+    assert can_change_module(original_code, changed_init, preexisting_objects)
+
+    new_method = """class Sorter:
+    def sort_reversed(self):
+        return sorted(self.arr, reverse=True)
+"""
+    assert can_change_module(original_code, new_method, preexisting_objects)
+
+    assert can_change_module(original_code, "def helper(x:\n", preexisting_objects)
+
+    for optimized_code in (unchanged_helper, changed_method, changed_init, new_method):
+        if not can_change_module(original_code, optimized_code, preexisting_objects_with_other):
+            new_code = replace_in_test_module(
+                original_code, optimized_code, ["Sorter.sort", "helper"], preexisting_objects_with_other
+            )
+            assert is_zero_diff(original_code, new_code)
+
+
+def test_replace_functions_and_add_imports_cache() -> None:
+    original_code = """import math
+
+def distance(x, y):
+    return math.sqrt(x * x + y * y)
+"""
+    optim_code = """import math
+
+def distance(x, y):
+    return math.hypot(x, y)
+"""
+    preexisting_objects = find_preexisting_objects(original_code)
+    replace_functions_and_add_imports_cached.cache_clear()
+    new_code = replace_in_test_module(original_code, optim_code, ["distance"], preexisting_objects)
+    assert "math.hypot(x, y)" in new_code
+    # the same candidate replaced into the restored original again, e.g. the winning one at the end
+    assert replace_in_test_module(original_code, optim_code, ["distance"], set(preexisting_objects)) is new_code
+    assert replace_functions_and_add_imports_cached.cache_info().hits == 1
@@ -124,6 +124,21 @@ def test_basic_python_objects() -> None:
     assert comparator(a, b)
     assert not comparator(a, c)
 
+    # subclasses of the builtin types are not dispatched on their exact type, but compare the same way
+    class MyList(list):
+        pass
+
+    class MyDict(dict):
+        pass
+
+    assert comparator(MyList([1, 2.0, "a"]), MyList([1, 2.0, "a"]))
+    assert not comparator(MyList([1, 2]), MyList([1, 3]))
+    assert not comparator(MyList([1, 2]), [1, 2])
+    assert comparator(MyDict(a=[1.0]), MyDict(a=[1.0]))
+    assert not comparator(MyDict(a=1), MyDict(a=2))
+    assert comparator({"a": float("nan")}, {"a": float("nan")})
+    assert not comparator(True, 1)
+
 
 def test_standard_python_library_objects() -> None:
     a = datetime.datetime(2020, 2, 2, 2, 2, 2) # type: ignore
@@ -228,6 +243,18 @@ def test_numpy():
     h = np.float32(1.0)
     i = np.float32(1.0)
     assert comparator(h, i)
+    assert comparator(h, np.float32(1.000001))
+    assert not comparator(h, np.float32(1.1))
+    assert comparator(np.float32(np.inf), np.float32(np.inf))
+    assert not comparator(np.float32(np.inf), np.float32(-np.inf))
+    # NaN equals NaN like for floats, whether or not both sides are the same object
+    nan32 = np.float32("nan")
+    assert comparator(nan32, nan32)
+    assert comparator(np.float32("nan"), np.float32("nan"))
+    assert comparator(np.float16("nan"), np.float16("nan"))
+    assert comparator(np.complex64(complex("nan+1j")), np.complex64(complex("nan+1j")))
+    assert not comparator(np.float32("nan"), np.float32(1.0))
+    assert not comparator(np.float32(1.0), np.float32("nan"))
 
     j = np.float64(1.0)
     k = np.float64(1.0)
@@ -357,17 +384,21 @@ def test_scipy():
     assert not comparator(s, u)
     assert not comparator(a, s)
 
-    try:
-        import numpy as np
+    # same matrix as a, with the column indices of each row stored in a different order
+    x = sp.sparse.csr_matrix(([1, 3, 5, 4], [0, 2, 2, 0], [0, 1, 2, 4]), shape=(3, 3))
+    assert comparator(a, x)
+    x.data[3] = 6
+    assert not comparator(a, x)
 
-        row = np.array([0, 3, 1, 0])
-        col = np.array([0, 3, 1, 2])
-        data = np.array([4, 5, 7, 9])
-        v = sp.sparse.coo_array((data, (row, col)), shape=(4, 4)).toarray()
-        w = sp.sparse.coo_array((data, (row, col)), shape=(4, 4)).toarray()
-        assert comparator(v, w)
-    except ImportError:
-        print("Should run tests with numpy installed to test more thoroughly")
+    # scipy depends on numpy, so it is always importable here
+    import numpy as np
+
+    row = np.array([0, 3, 1, 0])
+    col = np.array([0, 3, 1, 2])
+    data = np.array([4, 5, 7, 9])
+    v = sp.sparse.coo_array((data, (row, col)), shape=(4, 4)).toarray()
+    w = sp.sparse.coo_array((data, (row, col)), shape=(4, 4)).toarray()
+    assert comparator(v, w)
 
 
 def test_pandas():
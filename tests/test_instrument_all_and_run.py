@@ -15,30 +15,34 @@ from codeflash.verification.equivalence import compare_test_results
 from codeflash.verification.instrument_codeflash_capture import instrument_codeflash_capture
 
 # Used by cli instrumentation
-codeflash_wrap_string = """def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, **kwargs):
+codeflash_wrap_string = """codeflash_index = {{}}
+codeflash_rows = []
+
+def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, codeflash_perf_counter_ns=time.perf_counter_ns, **kwargs):
     test_id = f'{{test_module_name}}:{{test_class_name}}:{{test_name}}:{{line_id}}:{{loop_index}}'
-    if not hasattr(codeflash_wrap, 'index'):
-        codeflash_wrap.index = {{}}
-    if test_id in codeflash_wrap.index:
-        codeflash_wrap.index[test_id] += 1
-    else:
-        codeflash_wrap.index[test_id] = 0
-    codeflash_test_index = codeflash_wrap.index[test_id]
+    codeflash_test_index = codeflash_index.get(test_id, 0)
+    codeflash_index[test_id] = codeflash_test_index + 1
     invocation_id = f'{{line_id}}_{{codeflash_test_index}}'
     print(f"!######{{test_module_name}}:{{(test_class_name + '.' if test_class_name else '')}}{{test_name}}:{{function_name}}:{{loop_index}}:{{invocation_id}}######!")
     exception = None
     gc.disable()
     try:
-        counter = time.perf_counter_ns()
+        counter = codeflash_perf_counter_ns()
         return_value = wrapped(*args, **kwargs)
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
     except Exception as e:
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
         exception = e
     gc.enable()
-    pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
-    codeflash_cur.execute('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
-    codeflash_con.commit()
+    try:
+        pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
+    except Exception:
+        pickled_return_value = dill.dumps(exception) if exception else dill.dumps(return_value)
+    codeflash_rows.append((test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
+    if len(codeflash_rows) >= 50:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
     if exception:
         raise exception
     return return_value
@@ -61,14 +65,14 @@ def test_sort():
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -77,14 +81,20 @@ def test_sort():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    input = [5, 4, 3, 2, 1, 0]
-    output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0, 1, 2, 3, 4, 5]
-    input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
-    output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
-    codeflash_con.close()
+    try:
+        input = [5, 4, 3, 2, 1, 0]
+        output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0, 1, 2, 3, 4, 5]
+        input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+        output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
 
@@ -236,23 +246,21 @@ def test_sort():
 
     expected = """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from code_to_optimize.bubble_sort_method import BubbleSorter
 
+codeflash_index = {{}}
+codeflash_rows = []
 
-def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, **kwargs):
+def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, codeflash_perf_counter_ns=time.perf_counter_ns, **kwargs):
     test_id = f'{{test_module_name}}:{{test_class_name}}:{{test_name}}:{{line_id}}:{{loop_index}}'
-    if not hasattr(codeflash_wrap, 'index'):
-        codeflash_wrap.index = {{}}
-    if test_id in codeflash_wrap.index:
-        codeflash_wrap.index[test_id] += 1
-    else:
-        codeflash_wrap.index[test_id] = 0
-    codeflash_test_index = codeflash_wrap.index[test_id]
+    codeflash_test_index = codeflash_index.get(test_id, 0)
+    codeflash_index[test_id] = codeflash_test_index + 1
     invocation_id = f'{{line_id}}_{{codeflash_test_index}}'
     """
     if sys.version_info < (3, 12):
@@ -263,16 +271,22 @@ def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, functi
     exception = None
     gc.disable()
     try:
-        counter = time.perf_counter_ns()
+        counter = codeflash_perf_counter_ns()
         return_value = wrapped(*args, **kwargs)
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
     except Exception as e:
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
         exception = e
     gc.enable()
-    pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
-    codeflash_cur.execute('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
-    codeflash_con.commit()
+    try:
+        pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
+    except Exception:
+        pickled_return_value = dill.dumps(exception) if exception else dill.dumps(return_value)
+    codeflash_rows.append((test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
+    if len(codeflash_rows) >= 50:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
     if exception:
         raise exception
     return return_value
@@ -283,16 +297,22 @@ def test_sort():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    input = [5, 4, 3, 2, 1, 0]
-    sort_class = BubbleSorter()
-    output = codeflash_wrap(sort_class.sorter, '{module_path}', None, 'test_sort', 'BubbleSorter.sorter', '2', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0, 1, 2, 3, 4, 5]
-    input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
-    sort_class = BubbleSorter()
-    output = codeflash_wrap(sort_class.sorter, '{module_path}', None, 'test_sort', 'BubbleSorter.sorter', '6', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
-    codeflash_con.close()
+    try:
+        input = [5, 4, 3, 2, 1, 0]
+        sort_class = BubbleSorter()
+        output = codeflash_wrap(sort_class.sorter, '{module_path}', None, 'test_sort', 'BubbleSorter.sorter', '2', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0, 1, 2, 3, 4, 5]
+        input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+        sort_class = BubbleSorter()
+        output = codeflash_wrap(sort_class.sorter, '{module_path}', None, 'test_sort', 'BubbleSorter.sorter', '6', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     fto_path = (Path(__file__).parent.resolve() / "../code_to_optimize/bubble_sort_method.py").resolve()
     original_code = fto_path.read_text("utf-8")
@@ -223,6 +223,54 @@ class HelperClass:
         helper_path.unlink(missing_ok=True)
 
 
+def test_add_codeflash_capture_with_helper_in_same_file():
+    original_code = """
+class HelperClass:
+    def __init__(self):
+        self.y = 1
+
+class MyClass:
+    def __init__(self):
+        self.x = HelperClass()
+
+    def target_function(self):
+        return self.x.y + 1
+"""
+    test_path = (Path(__file__).parent.resolve() / "../code_to_optimize/tests/pytest/test_file.py").resolve()
+    expected = f"""
+from codeflash.verification.codeflash_capture import codeflash_capture
+
+
+class HelperClass:
+
+    @codeflash_capture(function_name='HelperClass.__init__', tmp_dir_path='{get_run_tmp_file(Path("test_return_values"))!s}', tests_root='{test_path.parent!s}', is_fto=False)
+    def __init__(self):
+        self.y = 1
+
+class MyClass:
+
+    @codeflash_capture(function_name='MyClass.__init__', tmp_dir_path='{get_run_tmp_file(Path("test_return_values"))!s}', tests_root='{test_path.parent!s}', is_fto=True)
+    def __init__(self):
+        self.x = HelperClass()
+
+    def target_function(self):
+        return self.x.y + 1
+"""
+    test_path.write_text(original_code)
+
+    function = FunctionToOptimize(
+        function_name="target_function", file_path=test_path, parents=[FunctionParent(type="ClassDef", name="MyClass")]
+    )
+
+    try:
+        instrument_codeflash_capture(function, {test_path: {"HelperClass", "MyClass"}}, test_path.parent)
+        modified_code = test_path.read_text()
+        assert modified_code.strip() == expected.strip()
+
+    finally:
+        test_path.unlink(missing_ok=True)
+
+
 def test_add_codeflash_capture_with_multiple_helpers():
     # Test input code with imports from two helper files
     original_code = """
@@ -27,53 +27,54 @@ from codeflash.models.models import (
 from codeflash.optimization.function_optimizer import FunctionOptimizer
 from codeflash.verification.verification_utils import TestConfig
 
-codeflash_wrap_string = """def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, **kwargs):
+codeflash_wrap_string = """codeflash_index = {{}}
+codeflash_rows = []
+
+def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, codeflash_perf_counter_ns=time.perf_counter_ns, **kwargs):
     test_id = f'{{test_module_name}}:{{test_class_name}}:{{test_name}}:{{line_id}}:{{loop_index}}'
-    if not hasattr(codeflash_wrap, 'index'):
-        codeflash_wrap.index = {{}}
-    if test_id in codeflash_wrap.index:
-        codeflash_wrap.index[test_id] += 1
-    else:
-        codeflash_wrap.index[test_id] = 0
-    codeflash_test_index = codeflash_wrap.index[test_id]
+    codeflash_test_index = codeflash_index.get(test_id, 0)
+    codeflash_index[test_id] = codeflash_test_index + 1
     invocation_id = f'{{line_id}}_{{codeflash_test_index}}'
     print(f"!######{{test_module_name}}:{{(test_class_name + '.' if test_class_name else '')}}{{test_name}}:{{function_name}}:{{loop_index}}:{{invocation_id}}######!")
     exception = None
     gc.disable()
     try:
-        counter = time.perf_counter_ns()
+        counter = codeflash_perf_counter_ns()
         return_value = wrapped(*args, **kwargs)
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
     except Exception as e:
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
         exception = e
     gc.enable()
-    pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
-    codeflash_cur.execute('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
-    codeflash_con.commit()
+    try:
+        pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
+    except Exception:
+        pickled_return_value = dill.dumps(exception) if exception else dill.dumps(return_value)
+    codeflash_rows.append((test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
+    if len(codeflash_rows) >= 50:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
     if exception:
         raise exception
     return return_value
 """
 
-codeflash_wrap_perfonly_string = """def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, *args, **kwargs):
+codeflash_wrap_perfonly_string = """codeflash_index = {{}}
+
+def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, *args, codeflash_perf_counter_ns=time.perf_counter_ns, **kwargs):
     test_id = f'{{test_module_name}}:{{test_class_name}}:{{test_name}}:{{line_id}}:{{loop_index}}'
-    if not hasattr(codeflash_wrap, 'index'):
-        codeflash_wrap.index = {{}}
-    if test_id in codeflash_wrap.index:
-        codeflash_wrap.index[test_id] += 1
-    else:
-        codeflash_wrap.index[test_id] = 0
-    codeflash_test_index = codeflash_wrap.index[test_id]
+    codeflash_test_index = codeflash_index.get(test_id, 0)
+    codeflash_index[test_id] = codeflash_test_index + 1
     invocation_id = f'{{line_id}}_{{codeflash_test_index}}'
     exception = None
     gc.disable()
     try:
-        counter = time.perf_counter_ns()
+        counter = codeflash_perf_counter_ns()
         return_value = wrapped(*args, **kwargs)
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
     except Exception as e:
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
         exception = e
     gc.enable()
     print(f"!######{{test_module_name}}:{{(test_class_name + '.' if test_class_name else '')}}{{test_name}}:{{function_name}}:{{loop_index}}:{{invocation_id}}:{{codeflash_duration}}######!")
@@ -104,25 +105,23 @@ class TestPigLatin(unittest.TestCase):
 """
     expected = """import gc
 import os
+import pickle
 import sqlite3
 import time
 import unittest
 
-import dill as pickle
+import dill
 import timeout_decorator
 
 from code_to_optimize.bubble_sort import sorter
 
+codeflash_index = {{}}
+codeflash_rows = []
 
-def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, **kwargs):
+def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, codeflash_perf_counter_ns=time.perf_counter_ns, **kwargs):
     test_id = f'{{test_module_name}}:{{test_class_name}}:{{test_name}}:{{line_id}}:{{loop_index}}'
-    if not hasattr(codeflash_wrap, 'index'):
-        codeflash_wrap.index = {{}}
-    if test_id in codeflash_wrap.index:
-        codeflash_wrap.index[test_id] += 1
-    else:
-        codeflash_wrap.index[test_id] = 0
-    codeflash_test_index = codeflash_wrap.index[test_id]
+    codeflash_test_index = codeflash_index.get(test_id, 0)
+    codeflash_index[test_id] = codeflash_test_index + 1
     invocation_id = f'{{line_id}}_{{codeflash_test_index}}'
     """
     if sys.version_info < (3, 12):
@@ -133,16 +132,22 @@ def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, functi
     exception = None
     gc.disable()
     try:
-        counter = time.perf_counter_ns()
+        counter = codeflash_perf_counter_ns()
         return_value = wrapped(*args, **kwargs)
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
     except Exception as e:
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
         exception = e
     gc.enable()
-    pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
-    codeflash_cur.execute('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
-    codeflash_con.commit()
+    try:
+        pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
+    except Exception:
+        pickled_return_value = dill.dumps(exception) if exception else dill.dumps(return_value)
+    codeflash_rows.append((test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
+    if len(codeflash_rows) >= 50:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
     if exception:
         raise exception
     return return_value
@@ -155,35 +160,42 @@ class TestPigLatin(unittest.TestCase):
         codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
         codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
         codeflash_cur = codeflash_con.cursor()
+        codeflash_cur.execute('PRAGMA synchronous = OFF')
         codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-        input = [5, 4, 3, 2, 1, 0]
-        output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        self.assertEqual(output, [0, 1, 2, 3, 4, 5])
-        input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
-        output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        self.assertEqual(output, [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
-        input = list(reversed(range(5000)))
-        self.assertEqual(codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '7', codeflash_loop_index, codeflash_cur, codeflash_con, input), list(range(5000)))
-        codeflash_con.close()
+        try:
+            input = [5, 4, 3, 2, 1, 0]
+            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            self.assertEqual(output, [0, 1, 2, 3, 4, 5])
+            input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            self.assertEqual(output, [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+            input = list(reversed(range(5000)))
+            self.assertEqual(codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '7', codeflash_loop_index, codeflash_cur, codeflash_con, input), list(range(5000)))
+        finally:
+            codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+            codeflash_rows.clear()
+            codeflash_con.commit()
+            codeflash_con.close()
 """
     with tempfile.NamedTemporaryFile(mode="w") as f:
         f.write(code)
         f.flush()
-        func = FunctionToOptimize(function_name="sorter", parents=[], file_path=Path(f.name))
+        test_file_path = Path(f.name)
+        func = FunctionToOptimize(function_name="sorter", parents=[], file_path=test_file_path)
         original_cwd = Path.cwd()
         run_cwd = Path(__file__).parent.parent.resolve()
         os.chdir(run_cwd)
         success, new_test = inject_profiling_into_existing_test(
-            Path(f.name),
+            test_file_path,
             [CodePosition(9, 17), CodePosition(13, 17), CodePosition(17, 17)],
             func,
-            Path(f.name).parent,
+            test_file_path.parent,
             "unittest",
         )
         os.chdir(original_cwd)
     assert success
     assert new_test == expected.format(
-        module_path=Path(f.name).name, tmp_dir_path=get_run_tmp_file(Path("test_return_values"))
+        module_path=test_file_path.name, tmp_dir_path=get_run_tmp_file(Path("test_return_values"))
     )
 
 
@@ -202,9 +214,11 @@ def test_prepare_image_for_yolo():
 """
     expected = """import gc
 import os
+import pickle
 import sqlite3
 import time
 
+import dill
 import dill as pickle
 import pytest
 from packagename.ml.yolo.image_reshaping_utils import \\
@@ -214,16 +228,13 @@ from packagename.ml.yolo.image_reshaping_utils import \\
 from codeflash.tracing.replay_test import get_next_arg_and_return
 from codeflash.validation.equivalence import compare_results
 
+codeflash_index = {{}}
+codeflash_rows = []
 
-def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, **kwargs):
+def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, codeflash_perf_counter_ns=time.perf_counter_ns, **kwargs):
     test_id = f'{{test_module_name}}:{{test_class_name}}:{{test_name}}:{{line_id}}:{{loop_index}}'
-    if not hasattr(codeflash_wrap, 'index'):
-        codeflash_wrap.index = {{}}
-    if test_id in codeflash_wrap.index:
-        codeflash_wrap.index[test_id] += 1
-    else:
-        codeflash_wrap.index[test_id] = 0
-    codeflash_test_index = codeflash_wrap.index[test_id]
+    codeflash_test_index = codeflash_index.get(test_id, 0)
+    codeflash_index[test_id] = codeflash_test_index + 1
     invocation_id = f'{{line_id}}_{{codeflash_test_index}}'
     """
     if sys.version_info < (3, 12):
@@ -234,16 +245,22 @@ def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, functi
     exception = None
     gc.disable()
     try:
-        counter = time.perf_counter_ns()
+        counter = codeflash_perf_counter_ns()
         return_value = wrapped(*args, **kwargs)
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
     except Exception as e:
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
         exception = e
     gc.enable()
-    pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
-    codeflash_cur.execute('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
-    codeflash_con.commit()
+    try:
+        pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
+    except Exception:
+        pickled_return_value = dill.dumps(exception) if exception else dill.dumps(return_value)
+    codeflash_rows.append((test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
+    if len(codeflash_rows) >= 50:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
     if exception:
         raise exception
     return return_value
@@ -253,34 +270,41 @@ def test_prepare_image_for_yolo():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
+    try:
 """
     if sys.version_info < (3, 11):
-        expected += """    for (arg_val_pkl, return_val_pkl) in get_next_arg_and_return('/home/saurabh/packagename/traces/first.trace', 3):
+        expected += """        for (arg_val_pkl, return_val_pkl) in get_next_arg_and_return('/home/saurabh/packagename/traces/first.trace', 3):
 """
     else:
-        expected += """    for arg_val_pkl, return_val_pkl in get_next_arg_and_return('/home/saurabh/packagename/traces/first.trace', 3):
+        expected += """        for arg_val_pkl, return_val_pkl in get_next_arg_and_return('/home/saurabh/packagename/traces/first.trace', 3):
 """
-    expected += """        args = pickle.loads(arg_val_pkl)
-        return_val_1 = pickle.loads(return_val_pkl)
-        ret = codeflash_wrap(packagename_ml_yolo_image_reshaping_utils_prepare_image_for_yolo, '{module_path}', None, 'test_prepare_image_for_yolo', 'packagename_ml_yolo_image_reshaping_utils_prepare_image_for_yolo', '0_2', codeflash_loop_index, codeflash_cur, codeflash_con, **args)
-        assert compare_results(return_val_1, ret)
-    codeflash_con.close()
+    expected += """            args = pickle.loads(arg_val_pkl)
+            return_val_1 = pickle.loads(return_val_pkl)
+            ret = codeflash_wrap(packagename_ml_yolo_image_reshaping_utils_prepare_image_for_yolo, '{module_path}', None, 'test_prepare_image_for_yolo', 'packagename_ml_yolo_image_reshaping_utils_prepare_image_for_yolo', '0_2', codeflash_loop_index, codeflash_cur, codeflash_con, **args)
+            assert compare_results(return_val_1, ret)
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     with tempfile.NamedTemporaryFile(mode="w") as f:
         f.write(code)
         f.flush()
+        test_file_path = Path(f.name)
         func = FunctionToOptimize(function_name="prepare_image_for_yolo", parents=[], file_path=Path("module.py"))
         original_cwd = Path.cwd()
         run_cwd = Path(__file__).parent.parent.resolve()
         os.chdir(run_cwd)
         success, new_test = inject_profiling_into_existing_test(
-            Path(f.name), [CodePosition(10, 14)], func, Path(f.name).parent, "pytest"
+            test_file_path, [CodePosition(10, 14)], func, test_file_path.parent, "pytest"
         )
         os.chdir(original_cwd)
     assert success
     assert new_test == expected.format(
-        module_path=Path(f.name).name, tmp_dir_path=get_run_tmp_file(Path("test_return_values"))
+        module_path=test_file_path.name, tmp_dir_path=get_run_tmp_file(Path("test_return_values"))
     )
 
 
@@ -301,14 +325,14 @@ def test_sort():
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -317,14 +341,20 @@ def test_sort():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    input = [5, 4, 3, 2, 1, 0]
-    output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0, 1, 2, 3, 4, 5]
-    input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
-    output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
-    codeflash_con.close()
+    try:
+        input = [5, 4, 3, 2, 1, 0]
+        output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0, 1, 2, 3, 4, 5]
+        input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+        output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
 
@@ -335,7 +365,6 @@ import time
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -551,15 +580,15 @@ def test_sort_parametrized(input, expected_output):
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 import pytest
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -569,10 +598,16 @@ def test_sort_parametrized(input, expected_output):
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort_parametrized', 'sorter', '0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == expected_output
-    codeflash_con.close()
+    try:
+        output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort_parametrized', 'sorter', '0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == expected_output
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
 
@@ -585,7 +620,6 @@ import pytest
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -805,15 +839,15 @@ def test_sort_parametrized_loop(input, expected_output):
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 import pytest
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -823,11 +857,17 @@ def test_sort_parametrized_loop(input, expected_output):
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    for i in range(2):
-        output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort_parametrized_loop', 'sorter', '0_0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        assert output == expected_output
-    codeflash_con.close()
+    try:
+        for i in range(2):
+            output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort_parametrized_loop', 'sorter', '0_0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            assert output == expected_output
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
     expected_perf = (
@@ -839,7 +879,6 @@ import pytest
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -1141,14 +1180,14 @@ def test_sort():
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -1157,15 +1196,21 @@ def test_sort():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    inputs = [[5, 4, 3, 2, 1, 0], [5.0, 4.0, 3.0, 2.0, 1.0, 0.0], list(reversed(range(50)))]
-    expected_outputs = [[0, 1, 2, 3, 4, 5], [0.0, 1.0, 2.0, 3.0, 4.0, 5.0], list(range(50))]
-    for i in range(3):
-        input = inputs[i]
-        expected_output = expected_outputs[i]
-        output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '2_2', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        assert output == expected_output
-    codeflash_con.close()
+    try:
+        inputs = [[5, 4, 3, 2, 1, 0], [5.0, 4.0, 3.0, 2.0, 1.0, 0.0], list(reversed(range(50)))]
+        expected_outputs = [[0, 1, 2, 3, 4, 5], [0.0, 1.0, 2.0, 3.0, 4.0, 5.0], list(range(50))]
+        for i in range(3):
+            input = inputs[i]
+            expected_output = expected_outputs[i]
+            output = codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '2_2', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            assert output == expected_output
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
 
@@ -1176,7 +1221,6 @@ import time
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -1420,16 +1464,16 @@ class TestPigLatin(unittest.TestCase):
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 import unittest
 
-import dill as pickle
+import dill
 import timeout_decorator
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -1441,17 +1485,23 @@ class TestPigLatin(unittest.TestCase):
         codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
         codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
         codeflash_cur = codeflash_con.cursor()
+        codeflash_cur.execute('PRAGMA synchronous = OFF')
         codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-        input = [5, 4, 3, 2, 1, 0]
-        output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        self.assertEqual(output, [0, 1, 2, 3, 4, 5])
-        input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
-        output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        self.assertEqual(output, [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
-        input = list(reversed(range(50)))
-        output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '7', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        self.assertEqual(output, list(range(50)))
-        codeflash_con.close()
+        try:
+            input = [5, 4, 3, 2, 1, 0]
+            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            self.assertEqual(output, [0, 1, 2, 3, 4, 5])
+            input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            self.assertEqual(output, [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+            input = list(reversed(range(50)))
+            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '7', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            self.assertEqual(output, list(range(50)))
+        finally:
+            codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+            codeflash_rows.clear()
+            codeflash_con.commit()
+            codeflash_con.close()
 """
     )
     expected_perf = (
@@ -1464,7 +1514,6 @@ import timeout_decorator
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -1686,17 +1735,17 @@ class TestPigLatin(unittest.TestCase):
     expected_behavior = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 import unittest
 
-import dill as pickle
+import dill
 import timeout_decorator
 from parameterized import parameterized
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -1709,10 +1758,16 @@ class TestPigLatin(unittest.TestCase):
         codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
         codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
         codeflash_cur = codeflash_con.cursor()
+        codeflash_cur.execute('PRAGMA synchronous = OFF')
         codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-        output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-        self.assertEqual(output, expected_output)
-        codeflash_con.close()
+        try:
+            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+            self.assertEqual(output, expected_output)
+        finally:
+            codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+            codeflash_rows.clear()
+            codeflash_con.commit()
+            codeflash_con.close()
 """
     )
     expected_perf = (
@@ -1726,7 +1781,6 @@ from parameterized import parameterized
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -1933,16 +1987,16 @@ class TestPigLatin(unittest.TestCase):
     expected_behavior = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 import unittest
 
-import dill as pickle
+import dill
 import timeout_decorator
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -1954,15 +2008,21 @@ class TestPigLatin(unittest.TestCase):
         codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
         codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
         codeflash_cur = codeflash_con.cursor()
+        codeflash_cur.execute('PRAGMA synchronous = OFF')
         codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-        inputs = [[5, 4, 3, 2, 1, 0], [5.0, 4.0, 3.0, 2.0, 1.0, 0.0], list(reversed(range(50)))]
-        expected_outputs = [[0, 1, 2, 3, 4, 5], [0.0, 1.0, 2.0, 3.0, 4.0, 5.0], list(range(50))]
-        for i in range(3):
-            input = inputs[i]
-            expected_output = expected_outputs[i]
-            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '2_2', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-            self.assertEqual(output, expected_output)
-        codeflash_con.close()
+        try:
+            inputs = [[5, 4, 3, 2, 1, 0], [5.0, 4.0, 3.0, 2.0, 1.0, 0.0], list(reversed(range(50)))]
+            expected_outputs = [[0, 1, 2, 3, 4, 5], [0.0, 1.0, 2.0, 3.0, 4.0, 5.0], list(range(50))]
+            for i in range(3):
+                input = inputs[i]
+                expected_output = expected_outputs[i]
+                output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '2_2', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+                self.assertEqual(output, expected_output)
+        finally:
+            codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+            codeflash_rows.clear()
+            codeflash_con.commit()
+            codeflash_con.close()
 """
     )
 
@@ -1976,7 +2036,6 @@ import timeout_decorator
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -2187,17 +2246,17 @@ class TestPigLatin(unittest.TestCase):
     expected_behavior = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 import unittest
 
-import dill as pickle
+import dill
 import timeout_decorator
 from parameterized import parameterized
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -2210,11 +2269,17 @@ class TestPigLatin(unittest.TestCase):
         codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
         codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
         codeflash_cur = codeflash_con.cursor()
+        codeflash_cur.execute('PRAGMA synchronous = OFF')
         codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-        for i in range(2):
-            output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '0_0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-            self.assertEqual(output, expected_output)
-        codeflash_con.close()
+        try:
+            for i in range(2):
+                output = codeflash_wrap(sorter, '{module_path}', 'TestPigLatin', 'test_sort', 'sorter', '0_0', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+                self.assertEqual(output, expected_output)
+        finally:
+            codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+            codeflash_rows.clear()
+            codeflash_con.commit()
+            codeflash_con.close()
 """
     )
     expected_perf = (
@@ -2228,7 +2293,6 @@ from parameterized import parameterized
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -2520,13 +2584,13 @@ def test_class_name_A_function_name():
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 from module import class_name as class_name_A
 
-
 """
         + codeflash_wrap_string
         + """
@@ -2535,9 +2599,15 @@ def test_class_name_A_function_name():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    ret = codeflash_wrap(class_name_A.function_name, '{module_path}', None, 'test_class_name_A_function_name', 'class_name_A.function_name', '0', codeflash_loop_index, codeflash_cur, codeflash_con, **args)
-    codeflash_con.close()
+    try:
+        ret = codeflash_wrap(class_name_A.function_name, '{module_path}', None, 'test_class_name_A_function_name', 'class_name_A.function_name', '0', codeflash_loop_index, codeflash_cur, codeflash_con, **args)
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
 
@@ -2588,14 +2658,14 @@ def test_common_tags_1():
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from codeflash.result.common_tags import find_common_tags
 
-
 """
         + codeflash_wrap_string
         + """
@@ -2604,12 +2674,18 @@ def test_common_tags_1():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    articles_1 = [1, 2, 3]
-    assert codeflash_wrap(find_common_tags, '{module_path}', None, 'test_common_tags_1', 'find_common_tags', '1', codeflash_loop_index, codeflash_cur, codeflash_con, articles_1) == set(1, 2)
-    articles_2 = [1, 2]
-    assert codeflash_wrap(find_common_tags, '{module_path}', None, 'test_common_tags_1', 'find_common_tags', '3', codeflash_loop_index, codeflash_cur, codeflash_con, articles_2) == set(1)
-    codeflash_con.close()
+    try:
+        articles_1 = [1, 2, 3]
+        assert codeflash_wrap(find_common_tags, '{module_path}', None, 'test_common_tags_1', 'find_common_tags', '1', codeflash_loop_index, codeflash_cur, codeflash_con, articles_1) == set(1, 2)
+        articles_2 = [1, 2]
+        assert codeflash_wrap(find_common_tags, '{module_path}', None, 'test_common_tags_1', 'find_common_tags', '3', codeflash_loop_index, codeflash_cur, codeflash_con, articles_2) == set(1)
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
 
@@ -2655,14 +2731,14 @@ def test_sort():
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from code_to_optimize.bubble_sort import sorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -2671,11 +2747,17 @@ def test_sort():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    input = [5, 4, 3, 2, 1, 0]
-    if len(input) > 0:
-        assert codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '1_0', codeflash_loop_index, codeflash_cur, codeflash_con, input) == [0, 1, 2, 3, 4, 5]
-    codeflash_con.close()
+    try:
+        input = [5, 4, 3, 2, 1, 0]
+        if len(input) > 0:
+            assert codeflash_wrap(sorter, '{module_path}', None, 'test_sort', 'sorter', '1_0', codeflash_loop_index, codeflash_cur, codeflash_con, input) == [0, 1, 2, 3, 4, 5]
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
     test_path = (
@@ -2722,14 +2804,14 @@ def test_sort():
     expected = (
         """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from code_to_optimize.bubble_sort import BubbleSorter
 
-
 """
         + codeflash_wrap_string
         + """
@@ -2738,14 +2820,20 @@ def test_sort():
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    input = [5, 4, 3, 2, 1, 0]
-    output = codeflash_wrap(BubbleSorter.sorter, 'tests.pytest.test_perfinjector_bubble_sort_results_temp', None, 'test_sort', 'BubbleSorter.sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0, 1, 2, 3, 4, 5]
-    input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
-    output = codeflash_wrap(BubbleSorter.sorter, '{module_path}', None, 'test_sort', 'BubbleSorter.sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
-    assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
-    codeflash_con.close()
+    try:
+        input = [5, 4, 3, 2, 1, 0]
+        output = codeflash_wrap(BubbleSorter.sorter, 'tests.pytest.test_perfinjector_bubble_sort_results_temp', None, 'test_sort', 'BubbleSorter.sorter', '1', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0, 1, 2, 3, 4, 5]
+        input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+        output = codeflash_wrap(BubbleSorter.sorter, '{module_path}', None, 'test_sort', 'BubbleSorter.sorter', '4', codeflash_loop_index, codeflash_cur, codeflash_con, input)
+        assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
     )
 
@@ -2823,23 +2911,21 @@ def test_code_replacement10() -> None:
 
     expected = """import gc
 import os
+import pickle
 import sqlite3
 import time
 
-import dill as pickle
+import dill
 
 from codeflash.optimization.optimizer import Optimizer
 
+codeflash_index = {{}}
+codeflash_rows = []
 
-def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, **kwargs):
+def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, function_name, line_id, loop_index, codeflash_cur, codeflash_con, *args, codeflash_perf_counter_ns=time.perf_counter_ns, **kwargs):
     test_id = f'{{test_module_name}}:{{test_class_name}}:{{test_name}}:{{line_id}}:{{loop_index}}'
-    if not hasattr(codeflash_wrap, 'index'):
-        codeflash_wrap.index = {{}}
-    if test_id in codeflash_wrap.index:
-        codeflash_wrap.index[test_id] += 1
-    else:
-        codeflash_wrap.index[test_id] = 0
-    codeflash_test_index = codeflash_wrap.index[test_id]
+    codeflash_test_index = codeflash_index.get(test_id, 0)
+    codeflash_index[test_id] = codeflash_test_index + 1
     invocation_id = f'{{line_id}}_{{codeflash_test_index}}'
 """
     if sys.version_info < (3, 12):
@@ -2850,16 +2936,22 @@ def codeflash_wrap(wrapped, test_module_name, test_class_name, test_name, functi
     exception = None
     gc.disable()
     try:
-        counter = time.perf_counter_ns()
+        counter = codeflash_perf_counter_ns()
         return_value = wrapped(*args, **kwargs)
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
     except Exception as e:
-        codeflash_duration = time.perf_counter_ns() - counter
+        codeflash_duration = codeflash_perf_counter_ns() - counter
         exception = e
     gc.enable()
-    pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
-    codeflash_cur.execute('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
-    codeflash_con.commit()
+    try:
+        pickled_return_value = pickle.dumps(exception) if exception else pickle.dumps(return_value)
+    except Exception:
+        pickled_return_value = dill.dumps(exception) if exception else dill.dumps(return_value)
+    codeflash_rows.append((test_module_name, test_class_name, test_name, function_name, loop_index, invocation_id, codeflash_duration, pickled_return_value, 'function_call'))
+    if len(codeflash_rows) >= 50:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
     if exception:
         raise exception
     return return_value
@@ -2869,38 +2961,45 @@ def test_code_replacement10() -> None:
     codeflash_iteration = os.environ['CODEFLASH_TEST_ITERATION']
     codeflash_con = sqlite3.connect(f'{tmp_dir_path}_{{codeflash_iteration}}.sqlite')
     codeflash_cur = codeflash_con.cursor()
+    codeflash_cur.execute('PRAGMA synchronous = OFF')
     codeflash_cur.execute('CREATE TABLE IF NOT EXISTS test_results (test_module_path TEXT, test_class_name TEXT, test_function_name TEXT, function_getting_tested TEXT, loop_index INTEGER, iteration_id TEXT, runtime INTEGER, return_value BLOB, verification_type TEXT)')
-    get_code_output = 'random code'
-    file_path = Path(__file__).resolve()
-    opt = Optimizer(Namespace(project_root=str(file_path.parent.resolve()), disable_telemetry=True, tests_root='tests', test_framework='pytest', pytest_cmd='pytest', experiment_id=None))
-    func_top_optimize = FunctionToOptimize(function_name='main_method', file_path=str(file_path), parents=[FunctionParent('MainClass', 'ClassDef')])
-    with open(file_path) as f:
-        original_code = f.read()
-        code_context = codeflash_wrap(opt.get_code_optimization_context, '{module_path}', None, 'test_code_replacement10', 'Optimizer.get_code_optimization_context', '4_1', codeflash_loop_index, codeflash_cur, codeflash_con, function_to_optimize=func_top_optimize, project_root=str(file_path.parent), original_source_code=original_code).unwrap()
-        assert code_context.testgen_context_code == get_code_output
-        code_context = codeflash_wrap(opt.get_code_optimization_context, '{module_path}', None, 'test_code_replacement10', 'Optimizer.get_code_optimization_context', '4_3', codeflash_loop_index, codeflash_cur, codeflash_con, function_to_optimize=func_top_optimize, project_root=str(file_path.parent), original_source_code=original_code)
-        assert code_context.testgen_context_code == get_code_output
-    codeflash_con.close()
+    try:
+        get_code_output = 'random code'
+        file_path = Path(__file__).resolve()
+        opt = Optimizer(Namespace(project_root=str(file_path.parent.resolve()), disable_telemetry=True, tests_root='tests', test_framework='pytest', pytest_cmd='pytest', experiment_id=None))
+        func_top_optimize = FunctionToOptimize(function_name='main_method', file_path=str(file_path), parents=[FunctionParent('MainClass', 'ClassDef')])
+        with open(file_path) as f:
+            original_code = f.read()
+            code_context = codeflash_wrap(opt.get_code_optimization_context, '{module_path}', None, 'test_code_replacement10', 'Optimizer.get_code_optimization_context', '4_1', codeflash_loop_index, codeflash_cur, codeflash_con, function_to_optimize=func_top_optimize, project_root=str(file_path.parent), original_source_code=original_code).unwrap()
+            assert code_context.testgen_context_code == get_code_output
+            code_context = codeflash_wrap(opt.get_code_optimization_context, '{module_path}', None, 'test_code_replacement10', 'Optimizer.get_code_optimization_context', '4_3', codeflash_loop_index, codeflash_cur, codeflash_con, function_to_optimize=func_top_optimize, project_root=str(file_path.parent), original_source_code=original_code)
+            assert code_context.testgen_context_code == get_code_output
+    finally:
+        codeflash_cur.executemany('INSERT INTO test_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', codeflash_rows)
+        codeflash_rows.clear()
+        codeflash_con.commit()
+        codeflash_con.close()
 """
 
     with tempfile.NamedTemporaryFile(mode="w") as f:
         f.write(code)
         f.flush()
+        test_file_path = Path(f.name)
         func = FunctionToOptimize(
             function_name="get_code_optimization_context",
             parents=[FunctionParent("Optimizer", "ClassDef")],
-            file_path=Path(f.name),
+            file_path=test_file_path,
         )
         original_cwd = Path.cwd()
         run_cwd = Path(__file__).parent.parent.resolve()
         os.chdir(run_cwd)
         success, new_test = inject_profiling_into_existing_test(
-            Path(f.name), [CodePosition(22, 28), CodePosition(28, 28)], func, Path(f.name).parent, "pytest"
+            test_file_path, [CodePosition(22, 28), CodePosition(28, 28)], func, test_file_path.parent, "pytest"
         )
         os.chdir(original_cwd)
     assert success
     assert new_test == expected.format(
-        module_path=Path(f.name).name, tmp_dir_path=get_run_tmp_file(Path("test_return_values"))
+        module_path=test_file_path.name, tmp_dir_path=get_run_tmp_file(Path("test_return_values"))
     )
 
 
@@ -2926,7 +3025,6 @@ import pytest
 
 from code_to_optimize.sleeptime import accurate_sleepfunc
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
@@ -3043,7 +3141,6 @@ from parameterized import parameterized
 
 from code_to_optimize.sleeptime import accurate_sleepfunc
 
-
 """
         + codeflash_wrap_perfonly_string
         + """
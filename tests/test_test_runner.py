@@ -2,9 +2,14 @@ import os
 import tempfile
 from pathlib import Path
 
-from codeflash.models.models import TestFile, TestFiles, TestType
-from codeflash.verification.parse_test_output import parse_test_xml
-from codeflash.verification.test_runner import run_behavioral_tests
+import pytest
+
+from codeflash.code_utils.code_utils import get_run_tmp_file
+from codeflash.code_utils.instrument_existing_tests import inject_profiling_into_existing_test
+from codeflash.discovery.functions_to_optimize import FunctionToOptimize
+from codeflash.models.models import CodePosition, TestFile, TestFiles, TestingMode, TestType
+from codeflash.verification.parse_test_output import parse_test_results, parse_test_xml
+from codeflash.verification.test_runner import get_pytest_fork_server, run_behavioral_tests
 from codeflash.verification.verification_utils import TestConfig
 
 
@@ -96,3 +101,203 @@ def test_sort():
         )
     assert results[0].did_pass, "Test did not pass as expected"
     result_file.unlink(missing_ok=True)
+
+
+def test_pytest_runner_cache_fixture():
+    code = """
+def test_cache(cache):
+    cache.set("codeflash/value", [1, 2, 3])
+    assert cache.get("codeflash/value", None) == [1, 2, 3]
+"""
+    cur_dir_path = Path(__file__).resolve().parent
+    config = TestConfig(
+        tests_root=cur_dir_path,
+        project_root_path=cur_dir_path,
+        test_framework="pytest",
+        tests_project_rootdir=cur_dir_path.parent,
+    )
+
+    test_env = os.environ.copy()
+    test_env["CODEFLASH_TEST_ITERATION"] = "0"
+    test_env["CODEFLASH_TRACER_DISABLE"] = "1"
+    if "PYTHONPATH" not in test_env:
+        test_env["PYTHONPATH"] = str(config.project_root_path)
+    else:
+        test_env["PYTHONPATH"] += os.pathsep + str(config.project_root_path)
+
+    with tempfile.NamedTemporaryFile(prefix="test_xx", suffix=".py", dir=cur_dir_path) as fp:
+        test_files = TestFiles(
+            test_files=[TestFile(instrumented_behavior_file_path=Path(fp.name), test_type=TestType.EXISTING_UNIT_TEST)]
+        )
+        fp.write(code.encode("utf-8"))
+        fp.flush()
+        result_file, process, _, _ = run_behavioral_tests(
+            test_files,
+            test_framework=config.test_framework,
+            cwd=Path(config.project_root_path),
+            test_env=test_env,
+            pytest_timeout=1,
+            pytest_target_runtime_seconds=1,
+        )
+        results = parse_test_xml(
+            test_xml_file_path=result_file, test_files=test_files, test_config=config, run_result=process
+        )
+    assert results[0].did_pass, "Test did not pass as expected"
+    # the cache is written to the run's temporary directory, not the user's project
+    assert get_run_tmp_file(Path("pytest_cache")).is_dir()
+    result_file.unlink(missing_ok=True)
+
+
+def test_pytest_runner_fork_server():
+    code = """
+def sorter(arr):
+    arr.sort()
+    return arr
+
+def test_sort():
+    arr = [5, 4, 3, 2, 1, 0]
+    output = sorter(arr)
+    assert output == [0, 1, 2, 3, 4, 5]
+"""
+    cur_dir_path = Path(__file__).resolve().parent
+    config = TestConfig(
+        tests_root=cur_dir_path,
+        project_root_path=cur_dir_path,
+        test_framework="pytest",
+        tests_project_rootdir=cur_dir_path.parent,
+    )
+
+    test_env = os.environ.copy()
+    test_env["CODEFLASH_TEST_ITERATION"] = "0"
+    test_env["CODEFLASH_TRACER_DISABLE"] = "1"
+    if "PYTHONPATH" not in test_env:
+        test_env["PYTHONPATH"] = str(config.project_root_path)
+    else:
+        test_env["PYTHONPATH"] += os.pathsep + str(config.project_root_path)
+
+    with tempfile.NamedTemporaryFile(prefix="test_xx", suffix=".py", dir=cur_dir_path) as fp:
+        test_files = TestFiles(
+            test_files=[TestFile(instrumented_behavior_file_path=Path(fp.name), test_type=TestType.EXISTING_UNIT_TEST)]
+        )
+        fp.write(code.encode("utf-8"))
+        fp.flush()
+        # the second run is forked from the already running server
+        for _ in range(2):
+            result_file, process, _, _ = run_behavioral_tests(
+                test_files,
+                test_framework=config.test_framework,
+                cwd=Path(config.project_root_path),
+                test_env=test_env,
+                pytest_timeout=1,
+                pytest_target_runtime_seconds=1,
+                fork_server=True,
+            )
+            results = parse_test_xml(
+                test_xml_file_path=result_file, test_files=test_files, test_config=config, run_result=process
+            )
+            assert results[0].did_pass, "Test did not pass as expected"
+            assert "1 passed" in process.stdout
+            assert get_pytest_fork_server().process is not None
+    result_file.unlink(missing_ok=True)
+
+
+def test_pytest_runner_without_test_files():
+    cur_dir_path = Path(__file__).resolve().parent
+    result_file, process, coverage_database_file, _ = run_behavioral_tests(
+        TestFiles(test_files=[]), test_framework="pytest", cwd=cur_dir_path, test_env=os.environ.copy()
+    )
+    assert process.returncode == 0
+    assert not result_file.exists()
+    assert coverage_database_file is None
+
+
+def test_pytest_runner_parallel_matches_serial(monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("xdist")
+    # one worker per test file, regardless of the machine running the tests
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    code = """from code_to_optimize.bubble_sort import sorter
+
+
+def test_sort():
+    input = [5, 4, 3, 2, 1, 0]
+    output = sorter(input)
+    assert output == [0, 1, 2, 3, 4, 5]
+    input = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+    output = sorter(input)
+    assert output == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+"""
+    project_root_path = Path(__file__).parent.parent.resolve()
+    tests_root = project_root_path / "code_to_optimize/tests/pytest"
+    config = TestConfig(
+        tests_root=tests_root,
+        tests_project_rootdir=project_root_path,
+        project_root_path=project_root_path,
+        test_framework="pytest",
+        pytest_cmd="pytest",
+    )
+    func = FunctionToOptimize(
+        function_name="sorter", parents=[], file_path=project_root_path / "code_to_optimize/bubble_sort.py"
+    )
+    test_paths = [tests_root / f"test_parallel_runner_{i}_temp.py" for i in range(2)]
+    test_env = os.environ.copy()
+    test_env["CODEFLASH_TEST_ITERATION"] = "0"
+    test_env["CODEFLASH_LOOP_INDEX"] = "1"
+    try:
+        for test_path in test_paths:
+            test_path.write_text(code)
+            success, new_test = inject_profiling_into_existing_test(
+                test_path,
+                [CodePosition(6, 13), CodePosition(9, 13)],
+                func,
+                project_root_path,
+                "pytest",
+                mode=TestingMode.BEHAVIOR,
+            )
+            assert success
+            test_path.write_text(new_test)
+        test_files = TestFiles(
+            test_files=[
+                TestFile(
+                    instrumented_behavior_file_path=test_path,
+                    original_file_path=test_path,
+                    test_type=TestType.EXISTING_UNIT_TEST,
+                )
+                for test_path in test_paths
+            ]
+        )
+
+        run_results = {}
+        for parallel in (True, False):
+            result_file, process, _, _ = run_behavioral_tests(
+                test_files,
+                test_framework="pytest",
+                cwd=project_root_path,
+                test_env=test_env,
+                pytest_timeout=15,
+                pytest_target_runtime_seconds=1,
+                parallel=parallel,
+            )
+            assert ("--dist=loadfile" in process.args) == parallel
+            test_results, _ = parse_test_results(
+                result_file,
+                test_files=test_files,
+                test_config=config,
+                optimization_iteration=0,
+                function_name=None,
+                source_file=None,
+                coverage_database_file=None,
+                coverage_config_file=None,
+                run_result=process,
+            )
+            run_results[parallel] = sorted(
+                (result.unique_invocation_loop_id, result.did_pass, repr(result.return_value))
+                for result in test_results
+            )
+    finally:
+        for test_path in test_paths:
+            test_path.unlink(missing_ok=True)
+
+    # both workers write to the same results database, nothing may get lost or mixed up
+    assert len(run_results[True]) == 4
+    assert all(did_pass for _, did_pass, _ in run_results[True])
+    assert run_results[True] == run_results[False]